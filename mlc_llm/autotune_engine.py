@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Engine Configuration Autotuner
+
+Searches MLCEngine settings for the best throughput on the intent workload:
+engine mode (local / interactive / server), max batch size
+(max_num_sequence), prefill chunk size and KV cache capacity
+(max_total_sequence_length). Every trial runs in a fresh subprocess, so
+configurations cannot leak memory or compiled state into each other and the
+child's peak RSS is an honest memory figure for that configuration.
+
+The search is coordinate-wise by default: pick the best mode with MLC's
+defaults, then sweep one setting at a time keeping the best value so far.
+--exhaustive tries the full grid instead. Trials over the memory ceiling, over
+the p99 latency target, or with failed requests are rejected; the best of the
+rest is written as an engine profile that both test scripts load with
+--engine-profile.
+
+Peak RSS covers model weights and KV cache on unified-memory machines (Apple
+Silicon). On discrete GPUs the KV cache lives in device memory, so cap it with
+--gpu-memory-utilization as well.
+
+Usage:
+    python mlc_llm/autotune_engine.py --output engine-profile.json
+    python mlc_llm/autotune_engine.py --max-memory-mb 6000 --max-p99 2.0 --output engine-profile.json
+    python mlc_llm/autotune_engine.py --modes server --batch-sizes 4 8 16 --exhaustive
+    python mlc_llm/eval_intent_detection.py --full-eval --engine-profile engine-profile.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import queue
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from engine_profile import ENGINE_MODES, describe_profile, save_engine_profile
+from eval_intent_detection import COMPREHENSIVE_TEST_CASES, MODEL
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_trial(profile: Dict, workload: Dict, results) -> None:
+    """Subprocess entry point: build the engine, run the workload, report metrics"""
+    from eval_intent_detection import IntentEvaluator, RequestPolicy
+    from load_test import LoadTester, build_arrivals, poisson_arrivals
+
+    # Failed requests reject the configuration, so don't retry them
+    evaluator = IntentEvaluator(engine_profile=profile, request_policy=RequestPolicy(max_retries=0))
+    started = time.perf_counter()
+    if not evaluator.init_engine():
+        results.put({"error": "engine failed to initialize"})
+        return
+    load_seconds = time.perf_counter() - started
+
+    test_cases = COMPREHENSIVE_TEST_CASES
+    if workload["dataset"]:
+        test_cases = [tc for tc in test_cases if workload["dataset"] in tc.category]
+    rng = random.Random(workload["seed"])
+
+    # Warm up kernels and allocators so the first requests don't skew p99
+    warmup = LoadTester(evaluator, workload["temperature"], workload["concurrency"])
+    warmup.run_level(build_arrivals([0.0] * workload["warmup"], test_cases, rng), 0.0, verbose=False)
+
+    if workload["rate"]:
+        offsets = poisson_arrivals(workload["rate"], workload["requests"] / workload["rate"], rng)
+    else:
+        offsets = [0.0] * workload["requests"]
+    tester = LoadTester(evaluator, workload["temperature"], workload["concurrency"])
+    level = tester.run_level(build_arrivals(offsets, test_cases, rng), workload["rate"] or 0.0, verbose=False)
+
+    results.put({
+        "load_seconds": load_seconds,
+        "requests": level["requests"],
+        "errors": level["errors"],
+        "throughput": level["throughput"],
+        "ttft_p50": level["ttft_p50"],
+        "ttft_p99": level["ttft_p99"],
+        "e2e_p50": level["e2e_p50"],
+        "e2e_p99": level["e2e_p99"],
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+class EngineAutotuner:
+    def __init__(self, workload: Dict, max_memory_mb: Optional[float] = None,
+                 max_p99: Optional[float] = None, trial_timeout: float = 900.0,
+                 base_config: Optional[Dict] = None):
+        self.workload = workload
+        self.max_memory_mb = max_memory_mb
+        self.max_p99 = max_p99
+        self.trial_timeout = trial_timeout
+        self.poll_interval = 1.0
+        self.base_config = base_config or {}
+        self.trials: List[Dict] = []
+        self.context = multiprocessing.get_context("spawn")
+
+    def run(self, mode: str, config: Dict) -> Dict:
+        """Measure one configuration in a fresh process (cached per configuration)"""
+        profile = {"mode": mode, "engine_config": dict(self.base_config, **config)}
+        for trial in self.trials:
+            if trial["profile"] == profile:
+                return trial
+
+        print(f"\n🔧 Trial {len(self.trials) + 1}: {describe_profile(profile)}")
+        results = self.context.Queue()
+        process = self.context.Process(target=run_trial, args=(profile, self.workload, results))
+        process.start()
+        measured = self.wait_for_result(process, results)
+        process.join(timeout=30)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        if "error" not in measured and process.exitcode not in (0, None):
+            measured = {"error": f"trial exited with code {process.exitcode}"}
+
+        trial = {"profile": profile, "measured": measured, "rejected": self.reject_reason(measured)}
+        self.trials.append(trial)
+        self.print_trial(trial)
+        return trial
+
+    def wait_for_result(self, process, results) -> Dict:
+        """Poll for the trial's result, giving up as soon as the process dies"""
+        deadline = time.monotonic() + self.trial_timeout
+        while time.monotonic() < deadline:
+            try:
+                return results.get(timeout=self.poll_interval)
+            except queue.Empty:
+                pass
+            if not process.is_alive():
+                # A result put just before exiting may still be in flight
+                try:
+                    return results.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    code = process.exitcode
+                    reason = f"killed by signal {-code}" if code and code < 0 else f"exit code {code}"
+                    return {"error": f"trial process died without a result ({reason})"}
+        return {"error": f"no result within {self.trial_timeout:.0f}s"}
+
+    def reject_reason(self, measured: Dict) -> Optional[str]:
+        if "error" in measured:
+            return measured["error"]
+        if measured["errors"]:
+            return f"{measured['errors']} failed requests"
+        if self.max_memory_mb and measured["peak_rss_mb"] > self.max_memory_mb:
+            return f"peak memory {measured['peak_rss_mb']:.0f} MB over {self.max_memory_mb:.0f} MB"
+        if self.max_p99 and measured["e2e_p99"] > self.max_p99:
+            return f"p99 {measured['e2e_p99']:.3f}s over {self.max_p99:.3f}s"
+        return None
+
+    @staticmethod
+    def score(trial: Optional[Dict]):
+        """Higher is better: feasible first, then throughput, then lower p99"""
+        if trial is None or trial["rejected"]:
+            return (0, 0.0, 0.0)
+        return (1, trial["measured"]["throughput"], -trial["measured"]["e2e_p99"])
+
+    def best(self) -> Optional[Dict]:
+        feasible = [t for t in self.trials if not t["rejected"]]
+        return max(feasible, key=self.score) if feasible else None
+
+    def coordinate_search(self, modes: List[str], grid: Dict[str, List[int]]) -> Optional[Dict]:
+        """Pick the best mode on defaults, then sweep each setting in turn"""
+        for mode in modes:
+            self.run(mode, {})
+        leader = self.best()
+        if leader is None:
+            return None
+
+        mode = leader["profile"]["mode"]
+        config = {}
+        for field, values in grid.items():
+            # Interactive mode always runs one sequence at a time
+            if mode == "interactive" and field == "max_num_sequence":
+                continue
+            for value in values:
+                trial = self.run(mode, dict(config, **{field: value}))
+                if self.score(trial) > self.score(leader):
+                    leader = trial
+            config = {k: v for k, v in leader["profile"]["engine_config"].items() if k in grid}
+        return leader
+
+    def exhaustive_search(self, modes: List[str], grid: Dict[str, List[int]]) -> Optional[Dict]:
+        """Try every combination of mode and settings"""
+        fields = list(grid)
+        for mode in modes:
+            for values in itertools.product(*(grid[f] for f in fields)):
+                config = dict(zip(fields, values))
+                if mode == "interactive" and config.get("max_num_sequence", 1) != 1:
+                    continue
+                self.run(mode, config)
+        return self.best()
+
+    def print_trial(self, trial: Dict) -> None:
+        measured = trial["measured"]
+        if "error" in measured:
+            print(f"   ❌ {measured['error']}")
+            return
+        status = f"❌ rejected: {trial['rejected']}" if trial["rejected"] else "✅"
+        print(f"   {measured['throughput']:.2f} req/s | e2e p50 {measured['e2e_p50']:.3f}s "
+              f"p99 {measured['e2e_p99']:.3f}s | ttft p99 {measured['ttft_p99']:.3f}s | "
+              f"peak RSS {measured['peak_rss_mb']:.0f} MB | {status}")
+
+    def print_summary(self, best: Optional[Dict]) -> None:
+        print(f"\n🏁 AUTOTUNE SUMMARY ({len(self.trials)} trials)")
+        print("=" * 112)
+        print(f"   {'configuration':64s} {'req/s':>7s} {'p99':>8s} {'RSS MB':>8s}  status")
+        for trial in sorted(self.trials, key=self.score, reverse=True):
+            measured = trial["measured"]
+            label = describe_profile(trial["profile"])
+            if "error" in measured:
+                print(f"   {label:64s} {'-':>7s} {'-':>8s} {'-':>8s}  {measured['error']}")
+                continue
+            marker = "⭐" if trial is best else ("❌ " + trial["rejected"] if trial["rejected"] else "")
+            print(f"   {label:64s} {measured['throughput']:7.2f} {measured['e2e_p99']:7.3f}s "
+                  f"{measured['peak_rss_mb']:8.0f}  {marker}")
+
+        if best is None:
+            print("\n❌ No configuration met the constraints")
+        else:
+            print(f"\n⭐ Best: {describe_profile(best['profile'])} "
+                  f"({best['measured']['throughput']:.2f} req/s, p99 {best['measured']['e2e_p99']:.3f}s)")
+
+    def export_results(self, filename: str) -> None:
+        with open(Path(filename), 'w') as f:
+            json.dump({"workload": self.workload, "trials": self.trials}, f, indent=2)
+        print(f"📄 Results exported to {filename}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Autotune MLC engine configuration for throughput and latency')
+    parser.add_argument('--output', default='engine-profile.json', help='Where to write the best engine profile')
+    parser.add_argument('--modes', nargs='+', choices=ENGINE_MODES, default=list(ENGINE_MODES), help='Engine modes to try')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='max_num_sequence values to try')
+    parser.add_argument('--prefill-chunks', type=int, nargs='+', default=[512, 1024, 2048, 4096], help='prefill_chunk_size values to try')
+    parser.add_argument('--kv-capacities', type=int, nargs='+', default=[4096, 8192, 16384, 32768], help='max_total_sequence_length (KV cache tokens) values to try')
+    parser.add_argument('--gpu-memory-utilization', type=float, help='Fraction of GPU memory the engine may claim (applied to every trial)')
+    parser.add_argument('--exhaustive', action='store_true', help='Try the full grid instead of one setting at a time')
+    parser.add_argument('--max-memory-mb', type=float, help='Reject configurations whose peak RSS exceeds this')
+    parser.add_argument('--max-p99', type=float, help='Reject configurations whose p99 end-to-end latency exceeds this (seconds)')
+    parser.add_argument('--requests', type=int, default=64, help='Requests per trial')
+    parser.add_argument('--warmup', type=int, default=4, help='Warm-up requests per trial (not measured)')
+    parser.add_argument('--rate', type=float, help='Offered load in req/s (default: send all requests at once)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Maximum in-flight requests')
+    parser.add_argument('--dataset', help='Filter test cases by category (e.g., "ambiguous", "edge_case")')
+    parser.add_argument('--temp', type=float, default=0.1, help='Temperature (0.0-1.0)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for arrivals and query order')
+    parser.add_argument('--trial-timeout', type=float, default=900.0, help='Seconds before a trial is abandoned')
+    parser.add_argument('--export-results', help='Export every trial to a JSON file')
+
+    args = parser.parse_args()
+
+    if args.dataset and not any(args.dataset in tc.category for tc in COMPREHENSIVE_TEST_CASES):
+        print(f"❌ No test cases match filter: {args.dataset}")
+        return 1
+
+    workload = {
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "rate": args.rate,
+        "concurrency": args.concurrency,
+        "dataset": args.dataset,
+        "temperature": args.temp,
+        "seed": args.seed,
+    }
+    grid = {
+        "max_num_sequence": args.batch_sizes,
+        "prefill_chunk_size": args.prefill_chunks,
+        "max_total_sequence_length": args.kv_capacities,
+    }
+    base_config = {}
+    if args.gpu_memory_utilization is not None:
+        base_config["gpu_memory_utilization"] = args.gpu_memory_utilization
+
+    tuner = EngineAutotuner(workload, args.max_memory_mb, args.max_p99, args.trial_timeout, base_config)
+    print(f"🎛️  Autotuning {MODEL}: {args.requests} requests per trial, "
+          f"{'burst' if not args.rate else f'{args.rate:.2f} req/s'}, concurrency {args.concurrency}")
+
+    best = None
+    try:
+        if args.exhaustive:
+            best = tuner.exhaustive_search(args.modes, grid)
+        else:
+            best = tuner.coordinate_search(args.modes, grid)
+    except KeyboardInterrupt:
+        print("\n👋 Interrupted by user")
+        best = tuner.best()
+
+    tuner.print_summary(best)
+    if args.export_results:
+        tuner.export_results(args.export_results)
+    if best is None:
+        return 1
+
+    save_engine_profile(args.output, {
+        "mode": best["profile"]["mode"],
+        "engine_config": best["profile"]["engine_config"],
+        "model": MODEL,
+        "workload": workload,
+        "measured": best["measured"],
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
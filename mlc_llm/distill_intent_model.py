@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Intent Classifier Distillation
+
+Labels a large unlabeled query corpus with the LLM (the teacher), then trains a
+hashed character/word n-gram logistic-regression model (the student) in pure
+NumPy and exports its weights as compact JSON for the extension.
+
+Teacher labels are cached on disk, so re-running with more queries or different
+training settings only calls the model for queries it has not seen.
+
+Usage:
+    python mlc_llm/distill_intent_model.py --queries queries.txt --export intent-ngram.json
+    python mlc_llm/distill_intent_model.py --queries logs.jsonl --workers 8 --cache labels.jsonl
+    python mlc_llm/distill_intent_model.py --queries queries.txt --buckets 32768 --epochs 20
+    python mlc_llm/distill_intent_model.py --queries logs.jsonl --workers 32 --server-url http://127.0.0.1:8000
+
+Exported model format (all hashing is reproducible in TypeScript):
+    - text is lowercased and whitespace-collapsed
+    - char n-grams are taken over " " + text + " " (code points), prefixed "c:"
+    - word n-grams join [a-z0-9']+ tokens with a space, prefixed "w:"
+    - each n-gram is hashed with 32-bit FNV-1a over its UTF-8 bytes, modulo `buckets`
+    - feature counts are L2-normalized, score = bias + scale * sum(value * weight)
+    - P(search) = sigmoid(score); weights are int8, base64-encoded
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from engine_profile import load_engine_profile
+from eval_intent_detection import (COMPREHENSIVE_TEST_CASES, MODEL, IntentEvaluator, RequestPolicy,
+                                   load_prompt_from_typescript)
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+FNV_OFFSET = 0x811C9DC5
+FNV_PRIME = 0x01000193
+
+def fnv1a32(text: str) -> int:
+    """32-bit FNV-1a hash of the UTF-8 bytes of text"""
+    h = FNV_OFFSET
+    for byte in text.encode('utf-8'):
+        h = ((h ^ byte) * FNV_PRIME) & 0xFFFFFFFF
+    return h
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class HashedNgramFeaturizer:
+    def __init__(self, buckets: int = 2 ** 16, char_ngrams: Tuple[int, int] = (2, 4),
+                 word_ngrams: Tuple[int, int] = (1, 2)):
+        self.buckets = buckets
+        self.char_ngrams = char_ngrams
+        self.word_ngrams = word_ngrams
+        self._hash_cache: Dict[str, int] = {}
+
+    def ngrams(self, text: str) -> List[str]:
+        """All prefixed char and word n-grams of a query"""
+        text = normalize_text(text)
+        padded = f" {text} "
+        grams = []
+        for n in range(self.char_ngrams[0], self.char_ngrams[1] + 1):
+            grams.extend("c:" + padded[i:i + n] for i in range(len(padded) - n + 1))
+
+        words = WORD_RE.findall(text)
+        for n in range(self.word_ngrams[0], self.word_ngrams[1] + 1):
+            grams.extend("w:" + " ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        return grams
+
+    def features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Bucket indices and L2-normalized counts for one query"""
+        counts: Dict[int, int] = {}
+        for gram in self.ngrams(text):
+            bucket = self._hash_cache.get(gram)
+            if bucket is None:
+                bucket = fnv1a32(gram) % self.buckets
+                # Bound the memo so huge corpora do not grow it forever
+                if len(self._hash_cache) < 2_000_000:
+                    self._hash_cache[gram] = bucket
+            counts[bucket] = counts.get(bucket, 0) + 1
+
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        norm = np.sqrt((values * values).sum())
+        return indices, values / norm if norm > 0 else values
+
+    def transform(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """CSR-style (indices, values, indptr) feature matrix"""
+        all_indices, all_values, indptr = [], [], [0]
+        for text in texts:
+            indices, values = self.features(text)
+            all_indices.append(indices)
+            all_values.append(values)
+            indptr.append(indptr[-1] + len(indices))
+        return (np.concatenate(all_indices) if all_indices else np.zeros(0, dtype=np.int64),
+                np.concatenate(all_values) if all_values else np.zeros(0, dtype=np.float32),
+                np.asarray(indptr, dtype=np.int64))
+
+def gather_rows(matrix: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Select rows of a CSR matrix, returning (indices, values, local row ids)"""
+    indices, values, indptr = matrix
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = int(lengths.sum())
+    # Position of every nonzero of the selected rows in the original arrays
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+    return indices[offsets], values[offsets], np.repeat(np.arange(len(rows)), lengths)
+
+class HashedLogisticRegression:
+    def __init__(self, featurizer: HashedNgramFeaturizer):
+        self.featurizer = featurizer
+        self.weights = np.zeros(featurizer.buckets, dtype=np.float32)
+        self.bias = 0.0
+
+    def fit(self, matrix: Tuple[np.ndarray, np.ndarray, np.ndarray], labels: np.ndarray,
+            epochs: int = 10, learning_rate: float = 0.05, l2: float = 1e-6,
+            batch_size: int = 256, seed: int = 0, verbose: bool = True) -> None:
+        """Mini-batch Adam on the logistic loss"""
+        rng = np.random.default_rng(seed)
+        n = len(labels)
+        m_w = np.zeros_like(self.weights)
+        v_w = np.zeros_like(self.weights)
+        m_b = v_b = 0.0
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        step = 0
+
+        for epoch in range(1, epochs + 1):
+            order = rng.permutation(n)
+            loss = 0.0
+            for start in range(0, n, batch_size):
+                rows = order[start:start + batch_size]
+                indices, values, local = gather_rows(matrix, rows)
+                scores = np.bincount(local, weights=self.weights[indices] * values, minlength=len(rows)) + self.bias
+                probs = 1 / (1 + np.exp(-scores))
+                error = probs - labels[rows]
+                loss += float(np.logaddexp(0, -scores * (2 * labels[rows] - 1)).sum())
+
+                grad_w = np.bincount(indices, weights=error[local] * values,
+                                     minlength=len(self.weights)).astype(np.float32) / len(rows)
+                grad_w += l2 * self.weights
+                grad_b = float(error.mean())
+
+                step += 1
+                m_w = beta1 * m_w + (1 - beta1) * grad_w
+                v_w = beta2 * v_w + (1 - beta2) * grad_w * grad_w
+                m_b = beta1 * m_b + (1 - beta1) * grad_b
+                v_b = beta2 * v_b + (1 - beta2) * grad_b * grad_b
+                correction = np.sqrt(1 - beta2 ** step) / (1 - beta1 ** step)
+                self.weights -= learning_rate * correction * m_w / (np.sqrt(v_w) + eps)
+                self.bias -= learning_rate * correction * m_b / (np.sqrt(v_b) + eps)
+
+            if verbose:
+                print(f"   Epoch {epoch:2d}/{epochs}: loss {loss / n:.4f}")
+
+    def quantize(self) -> Tuple[np.ndarray, float]:
+        """Symmetric int8 quantization of the weights"""
+        scale = float(np.abs(self.weights).max()) / 127 or 1.0
+        return np.clip(np.round(self.weights / scale), -127, 127).astype(np.int8), scale
+
+    def load_quantized(self) -> None:
+        """Replace the weights with their int8 round trip (what the extension sees)"""
+        quantized, scale = self.quantize()
+        self.weights = quantized.astype(np.float32) * scale
+
+    def predict_proba(self, text: str) -> float:
+        indices, values = self.featurizer.features(text)
+        score = float(self.weights[indices] @ values) + self.bias
+        return 1 / (1 + np.exp(-score))
+
+    def export(self, filename: str) -> int:
+        """Write the model as compact JSON; returns the file size in bytes"""
+        quantized, scale = self.quantize()
+        model = {
+            "format": "hashed-ngram-logreg",
+            "version": 1,
+            "teacher": MODEL,
+            "hash": "fnv1a32",
+            "buckets": self.featurizer.buckets,
+            "charNgrams": list(self.featurizer.char_ngrams),
+            "wordNgrams": list(self.featurizer.word_ngrams),
+            "bias": self.bias,
+            "scale": scale,
+            "weights": base64.b64encode(quantized.tobytes()).decode('ascii'),
+        }
+        filepath = Path(filename)
+        filepath.write_text(json.dumps(model, separators=(',', ':')))
+        return filepath.stat().st_size
+
+class TeacherLabeler:
+    """Labels queries with the LLM, caching verdicts in an append-only JSONL file"""
+
+    def __init__(self, cache_path: str, temperature: float = 0.1, workers: int = 8,
+                 engine_profile: Optional[Dict] = None, request_policy: Optional[RequestPolicy] = None,
+                 server_url: Optional[str] = None):
+        self.cache_path = Path(cache_path)
+        self.temperature = temperature
+        self.workers = workers
+        self.engine_profile = engine_profile
+        self.request_policy = request_policy
+        self.server_url = server_url
+        self.evaluator: Optional[IntentEvaluator] = None
+        self.prompt_template = load_prompt_from_typescript()
+        self.prompt_hash = hashlib.sha256(self.prompt_template.encode('utf-8')).hexdigest()[:16]
+        self.cache: Dict[str, str] = {}
+        if self.cache_path.exists():
+            with open(self.cache_path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.cache[entry["key"]] = entry["label"]
+
+    def cache_key(self, query: str) -> str:
+        raw = f"{MODEL}\0{self.temperature}\0{self.prompt_hash}\0{query}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def label_one(self, query: str) -> Optional[str]:
+        prompt = self.prompt_template.replace('{message}', query)
+        response = self.evaluator.call_model(prompt, self.temperature)
+        parsed = self.evaluator.parse_response(response)
+        return None if "error" in parsed else parsed["intentCategory"]
+
+    def label_all(self, queries: List[str], verbose: bool = True) -> Dict[str, str]:
+        """Label every query, calling the model only for cache misses"""
+        pending = [q for q in queries if self.cache_key(q) not in self.cache]
+        print(f"🏷️  {len(queries) - len(pending)}/{len(queries)} teacher labels cached, {len(pending)} to label")
+
+        if pending:
+            if self.evaluator is None:
+                self.evaluator = IntentEvaluator(engine_profile=self.engine_profile,
+                                                 request_policy=self.request_policy, server_url=self.server_url)
+                if not self.evaluator.init_engine():
+                    sys.exit(1)
+
+            start = time.perf_counter()
+            failed = 0
+            # Concurrent requests let the engine batch decoding across queries
+            with ThreadPoolExecutor(max_workers=self.workers) as executor, open(self.cache_path, 'a') as cache_file:
+                futures = {executor.submit(self.label_one, q): q for q in pending}
+                for done, future in enumerate(as_completed(futures), 1):
+                    query = futures[future]
+                    label = future.result()
+                    if label is None:
+                        failed += 1
+                    else:
+                        key = self.cache_key(query)
+                        self.cache[key] = label
+                        cache_file.write(json.dumps({"key": key, "query": query, "label": label}) + "\n")
+                    if verbose and done % 100 == 0:
+                        rate = done / (time.perf_counter() - start)
+                        print(f"   Labeled {done}/{len(pending)} ({rate:.1f} queries/s)")
+
+            elapsed = time.perf_counter() - start
+            print(f"✅ Teacher labeled {len(pending) - failed} queries in {elapsed:.1f}s "
+                  f"({len(pending) / elapsed:.1f} queries/s, {failed} unparseable)")
+
+        return {q: self.cache[self.cache_key(q)] for q in queries if self.cache_key(q) in self.cache}
+
+def load_queries(filename: str) -> List[str]:
+    """Unique queries from a .txt (one per line) or .jsonl file with a "query" field"""
+    filepath = Path(filename)
+    seen = {}
+    with open(filepath) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            query = json.loads(line)["query"] if filepath.suffix.lower() == '.jsonl' else line.rstrip('\n')
+            seen.setdefault(query.strip(), None)
+    return list(seen)
+
+def main():
+    parser = argparse.ArgumentParser(description='Distill the LLM intent classifier into a hashed n-gram model')
+    parser.add_argument('--queries', required=True, help='Unlabeled queries (.txt one per line, or .jsonl with "query")')
+    parser.add_argument('--cache', default='teacher-labels.jsonl', help='Teacher label cache (JSONL)')
+    parser.add_argument('--export', default='intent-ngram.json', help='Output model file (JSON)')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent teacher requests')
+    parser.add_argument('--temp', type=float, default=0.1, help='Teacher temperature (0.0-1.0)')
+    parser.add_argument('--buckets', type=int, default=2 ** 16, help='Number of hash buckets')
+    parser.add_argument('--epochs', type=int, default=10, help='Training epochs')
+    parser.add_argument('--lr', type=float, default=0.05, help='Adam learning rate')
+    parser.add_argument('--holdout', type=float, default=0.1, help='Fraction of queries held out for evaluation')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the split and training')
+    parser.add_argument('--quiet', action='store_true', help='Reduce output verbosity')
+    parser.add_argument('--server-url', help='Label with a running OpenAI-compatible server instead of loading the model')
+    parser.add_argument('--engine-profile', help='Engine profile JSON (mode and EngineConfig) from autotune_engine.py')
+    parser.add_argument('--request-timeout', type=float, default=60.0, help='Seconds before a teacher call is cancelled (0 disables)')
+    parser.add_argument('--max-retries', type=int, default=2, help='Retries for failed or timed-out teacher calls')
+
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    print(f"📚 Loaded {len(queries)} unique queries from {args.queries}")
+
+    if args.engine_profile and args.server_url:
+        print("⚠️  --engine-profile is ignored with --server-url (configure the server instead)")
+    labeler = TeacherLabeler(
+        args.cache, args.temp, args.workers,
+        engine_profile=load_engine_profile(args.engine_profile) if args.engine_profile else None,
+        request_policy=RequestPolicy(timeout=args.request_timeout or None, max_retries=args.max_retries),
+        server_url=args.server_url,
+    )
+    labels = labeler.label_all(queries, verbose=not args.quiet)
+    labeled = [q for q in queries if q in labels]
+    if len(labeled) < 2:
+        print("❌ Not enough teacher labels to train on")
+        return 1
+
+    # Hold out a deterministic slice of queries to measure agreement with the teacher
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(labeled))
+    split = max(1, int(len(labeled) * args.holdout))
+    test_queries = [labeled[i] for i in order[:split]]
+    train_queries = [labeled[i] for i in order[split:]]
+
+    featurizer = HashedNgramFeaturizer(args.buckets)
+    model = HashedLogisticRegression(featurizer)
+    train_matrix = featurizer.transform(train_queries)
+    train_labels = np.array([labels[q] == "action" for q in train_queries], dtype=np.float32)
+
+    print(f"\n🎓 Training on {len(train_queries)} queries ({int(train_labels.sum())} action), {args.buckets} buckets")
+    model.fit(train_matrix, train_labels, epochs=args.epochs, learning_rate=args.lr,
+              seed=args.seed, verbose=not args.quiet)
+    size = model.export(args.export)
+    model.load_quantized()
+
+    # Score the exported (quantized) model one query at a time, like the extension would
+    start = time.perf_counter()
+    student = {q: "action" if model.predict_proba(q) >= 0.5 else "chat" for q in test_queries}
+    per_query_us = (time.perf_counter() - start) / len(test_queries) * 1e6
+
+    agreement = sum(1 for q in test_queries if student[q] == labels[q]) / len(test_queries)
+    gold_correct = sum(
+        1 for tc in COMPREHENSIVE_TEST_CASES
+        if ("action" if model.predict_proba(tc.query) >= 0.5 else "chat") == tc.expected
+    )
+
+    print(f"\n📊 DISTILLATION REPORT")
+    print("=" * 50)
+    print(f"   Agreement with teacher: {agreement:.1%} ({len(test_queries)} held-out queries)")
+    print(f"   Accuracy on built-in test cases: {gold_correct / len(COMPREHENSIVE_TEST_CASES):.1%} "
+          f"({gold_correct}/{len(COMPREHENSIVE_TEST_CASES)})")
+    print(f"   Inference time: {per_query_us:.1f} µs/query (featurize + score, Python)")
+    print(f"📄 Model exported to {args.export} ({size / 1024:.1f} KiB)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
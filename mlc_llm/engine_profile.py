@@ -0,0 +1,60 @@
+"""
+MLC Engine Profiles
+
+An engine profile is a small JSON file with the MLCEngine mode and EngineConfig
+fields to use, usually written by autotune_engine.py:
+
+    {
+      "mode": "server",
+      "engine_config": {"max_num_sequence": 8, "prefill_chunk_size": 1024},
+      "measured": {...}
+    }
+
+Both test scripts load it with --engine-profile. Without a profile the engine
+is built with MLC's defaults, as before.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+ENGINE_MODES = ("local", "interactive", "server")
+
+# EngineConfig fields the autotuner explores; others are passed through as-is
+TUNABLE_FIELDS = ("max_num_sequence", "prefill_chunk_size", "max_total_sequence_length")
+
+def load_engine_profile(filename: str) -> Dict:
+    """Read and validate an engine profile"""
+    with open(Path(filename)) as f:
+        profile = json.load(f)
+
+    mode = profile.get("mode", "local")
+    if mode not in ENGINE_MODES:
+        raise ValueError(f"Unknown engine mode {mode!r} in {filename} (expected one of {', '.join(ENGINE_MODES)})")
+    if not isinstance(profile.get("engine_config", {}), dict):
+        raise ValueError(f"engine_config in {filename} must be an object")
+    return profile
+
+def save_engine_profile(filename: str, profile: Dict) -> None:
+    with open(Path(filename), 'w') as f:
+        json.dump(profile, f, indent=2)
+    print(f"📄 Engine profile written to {filename}")
+
+def engine_kwargs(profile: Optional[Dict]) -> Dict:
+    """Keyword arguments for MLCEngine(model_path, **kwargs)"""
+    if not profile:
+        return {}
+
+    kwargs = {"mode": profile.get("mode", "local")}
+    config = {k: v for k, v in profile.get("engine_config", {}).items() if v is not None}
+    if config:
+        from mlc_llm.serve import EngineConfig
+        kwargs["engine_config"] = EngineConfig(**config)
+    return kwargs
+
+def describe_profile(profile: Optional[Dict]) -> str:
+    """One-line summary for logs"""
+    if not profile:
+        return "defaults"
+    config = ", ".join(f"{k}={v}" for k, v in profile.get("engine_config", {}).items() if v is not None)
+    return f"mode={profile.get('mode', 'local')}" + (f", {config}" if config else "")
@@ -10,6 +10,7 @@ Usage:
     python mlc_llm/eval_intent_detection.py --dataset ambiguous --temp 0.2
     python mlc_llm/eval_intent_detection.py --analyze-failures
     python mlc_llm/eval_intent_detection.py --export-results results.json
+    python mlc_llm/eval_intent_detection.py --full-eval --adaptive --ci-width 0.15
 """
 
 import argparse
@@ -17,19 +18,32 @@ import json
 import re
 import sys
 import csv
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+import uuid
 from pathlib import Path
 from collections import defaultdict, Counter
 from dataclasses import dataclass, asdict
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 import statistics
 
+from engine_profile import describe_profile, engine_kwargs, load_engine_profile
+from http_backend import DEFAULT_TIMEOUT, HTTPEngine
+from results_warehouse import ingest_export
+from trace_events import NULL_TRACER, make_tracer
+
 try:
     from mlc_llm import MLCEngine
     MLC_AVAILABLE = True
 except ImportError:
-    print("⚠️  MLC LLM not installed. Install with:")
-    print("   uv pip install --pre -f https://mlc.ai/wheels mlc-llm-nightly")
-    print("   uv pip install --pre -f https://mlc.ai/wheels mlc-ai-nightly")
+    # stderr, so tools that import this module can stream data on stdout
+    print("⚠️  MLC LLM not installed. Install with:", file=sys.stderr)
+    print("   uv pip install --pre -f https://mlc.ai/wheels mlc-llm-nightly", file=sys.stderr)
+    print("   uv pip install --pre -f https://mlc.ai/wheels mlc-ai-nightly", file=sys.stderr)
     MLC_AVAILABLE = False
 
 @dataclass
@@ -52,6 +66,47 @@ class EvalResult:
     category: str
     difficulty: str
     notes: str
+    weight: float = 1.0  # inverse inclusion probability when the case was subsampled
+
+@dataclass
+class ConversationTurn:
+    role: str  # 'user' or 'assistant'
+    content: str
+    expected: Optional[str] = None  # set on user turns that should be scored
+    category: str = "context_dependent"
+    difficulty: str = "hard"
+    notes: str = ""
+
+@dataclass
+class Conversation:
+    conversation_id: str
+    turns: List[ConversationTurn]
+
+@dataclass
+class AdaptiveConfig:
+    ci_width: float = 0.1  # stop once the interval is at most this wide
+    confidence_level: float = 0.95
+    baseline_results: Optional[str] = None  # exported JSON run to compare against
+    min_samples: int = 20
+    check_every: int = 5  # minimum cases between checks
+    check_growth: float = 0.05  # later checks are spaced by this fraction of the cases seen so far
+    bootstrap_samples: int = 200
+    seed: int = 0
+
+@dataclass
+class SamplingConfig:
+    budget: int  # number of cases to draw
+    hard_boost: float = 2.0  # extra sampling weight for historically hard/unstable queries
+    history: Optional[List[str]] = None  # exported JSON runs used to score hardness
+    seed: int = 0
+
+@dataclass
+class RequestPolicy:
+    timeout: Optional[float] = 60.0  # deadline per attempt in seconds (None waits forever)
+    max_retries: int = 2
+    backoff: float = 0.5  # delay before the first retry, doubled for each further retry
+    max_backoff: float = 8.0
+    restart_after: float = 30.0  # grace after cancelling before the engine counts as wedged
 
 # Comprehensive test dataset
 COMPREHENSIVE_TEST_CASES = [
@@ -138,6 +193,43 @@ COMPREHENSIVE_TEST_CASES = [
     TestCase("surface discussions about web3", "action", "formal_search", "medium", "Surface as search verb")
 ]
 
+# Multi-turn conversations: follow-ups are only classifiable with the earlier turns
+CONVERSATION_TEST_CASES = [
+    Conversation("ai-search", [
+        ConversationTurn("user", "find discussions about AI", "action", "explicit_search", "easy", "Opening search"),
+        ConversationTurn("assistant", "Here are 5 threads about AI: \"GPT-5 rumors\", \"Local LLMs on a laptop\", \"AI safety debate\", \"Copilot in practice\", \"Agents that actually work\"."),
+        ConversationTurn("user", "more on this topic", "action", "context_dependent", "hard", "Follow-up to a search"),
+        ConversationTurn("assistant", "Here are 5 more AI threads: \"Fine-tuning on a budget\", \"RAG pitfalls\", \"Open weights vs APIs\", \"Evaluating LLMs\", \"AI in healthcare\"."),
+        ConversationTurn("user", "what else?", "action", "context_dependent", "hard", "Second follow-up to a search"),
+    ]),
+    Conversation("react-search", [
+        ConversationTurn("user", "show me posts about React", "action", "explicit_search", "easy", "Opening search"),
+        ConversationTurn("assistant", "Found 3 threads: \"React 19 is out\", \"Server components in production\", \"Why we left Redux\"."),
+        ConversationTurn("user", "next", "action", "context_dependent", "hard", "Paging through results"),
+        ConversationTurn("assistant", "Next 3 threads: \"React Native in 2025\", \"Signals vs hooks\", \"Testing React apps\"."),
+        ConversationTurn("user", "thanks for your help", "chat", "gratitude", "easy", "Closing a search session"),
+    ]),
+    Conversation("python-search", [
+        ConversationTurn("user", "what's been said about Python lately?", "action", "question_search", "medium", "Opening search"),
+        ConversationTurn("assistant", "Recent threads: \"Python 3.13 free-threading\", \"uv replaced pip for us\", \"Typing is getting good\"."),
+        ConversationTurn("user", "continue", "action", "context_dependent", "hard", "Continuation of a search"),
+        ConversationTurn("assistant", "More threads: \"Packaging in 2025\", \"Async Python regrets\"."),
+        ConversationTurn("user", "similar threads", "action", "context_dependent", "hard", "Related content request"),
+    ]),
+    Conversation("ml-explanation", [
+        ConversationTurn("user", "can you explain machine learning?", "chat", "explanation_request", "medium", "Opening explanation"),
+        ConversationTurn("assistant", "Machine learning is a way of building software that learns patterns from data instead of following hand-written rules."),
+        ConversationTurn("user", "continue", "chat", "context_dependent", "hard", "Continuation of an explanation"),
+        ConversationTurn("assistant", "Models are trained by adjusting their parameters to reduce errors on examples, then used to make predictions on new data."),
+        ConversationTurn("user", "any posts about it?", "action", "context_dependent", "hard", "Switch to search on the same topic"),
+    ]),
+    Conversation("remote-work-opinion", [
+        ConversationTurn("user", "what's your opinion on remote work?", "chat", "opinion_request", "medium", "Opening opinion request"),
+        ConversationTurn("assistant", "Remote work gives people focus time and flexibility, but it makes mentoring and spontaneous collaboration harder."),
+        ConversationTurn("user", "what else?", "chat", "context_dependent", "hard", "Follow-up to an opinion, not a search"),
+    ]),
+]
+
 MODEL = "Llama-3.2-3B-Instruct-q4f16_1-MLC"
 
 def load_prompt_from_typescript():
@@ -185,13 +277,261 @@ Examples:
 
 JSON Response:"""
 
+def stratified_order(test_cases: List[TestCase], rng: random.Random) -> List[TestCase]:
+    """Randomized order in which every prefix is roughly category-proportional"""
+    by_category = defaultdict(list)
+    for tc in test_cases:
+        by_category[tc.category].append(tc)
+    
+    keyed = []
+    for cases in by_category.values():
+        rng.shuffle(cases)
+        # Spread each category evenly over [0, 1) with a random jitter per slot
+        for rank, tc in enumerate(cases):
+            keyed.append(((rank + rng.random()) / len(cases), tc))
+    
+    keyed.sort(key=lambda item: item[0])
+    return [tc for _, tc in keyed]
+
+def z_score(confidence_level: float) -> float:
+    """Two-sided normal critical value for a confidence level"""
+    return statistics.NormalDist().inv_cdf(1 - (1 - confidence_level) / 2)
+
+def wilson_interval(successes: int, total: int, z: float) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion"""
+    if total == 0:
+        return 0.0, 1.0
+    p = successes / total
+    denom = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denom
+    margin = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denom
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+def look_confidence(confidence_level: float, look: int) -> float:
+    """Confidence level for the look-th interim check under alpha spending
+    
+    Spends alpha * 6 / (pi^2 * k^2) at check k; these sum to alpha, so
+    stopping at any check keeps the overall error rate at the nominal level.
+    """
+    return 1 - (1 - confidence_level) * 6 / (math.pi ** 2 * look ** 2)
+
+def f1_from_counts(tp: int, fp: int, fn: int) -> float:
+    return 2 * tp / (2 * tp + fp + fn) if tp > 0 else 0.0
+
+def f1_from_results(results: List[EvalResult]) -> float:
+    """F1 score for the "action" class"""
+    tp = sum(1 for r in results if r.expected == "action" and r.predicted == "action")
+    fp = sum(1 for r in results if r.expected == "chat" and r.predicted == "action")
+    fn = sum(1 for r in results if r.expected == "action" and r.predicted == "chat")
+    return f1_from_counts(tp, fp, fn)
+
+def load_baseline_correctness(filename: str) -> Dict[str, bool]:
+    """Map query -> correct from a run exported with --export-results (JSON)"""
+    with open(filename) as f:
+        data = json.load(f)
+    return {r["query"]: r["correct"] for r in data.get("results", [])}
+
+def load_test_cases(filename: str) -> List[TestCase]:
+    """Load test cases from a JSONL, JSON or CSV file with TestCase fields"""
+    filepath = Path(filename)
+    fields = ("query", "expected", "category", "difficulty", "notes")
+    
+    with open(filepath, newline='') as f:
+        if filepath.suffix.lower() == '.csv':
+            rows = csv.DictReader(f)
+        elif filepath.suffix.lower() == '.json':
+            rows = json.load(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        return [TestCase(**{k: row.get(k, "") for k in fields}) for row in rows]
+
+def load_query_hardness(filenames: List[str]) -> Dict[str, float]:
+    """Score each query in [0, 1] from past exported runs
+    
+    Hardness is the failure rate across runs, raised to 1.0 when the
+    prediction flipped between runs (unstable queries).
+    """
+    outcomes = defaultdict(list)
+    for filename in filenames:
+        with open(filename) as f:
+            for r in json.load(f).get("results", []):
+                outcomes[r["query"]].append((r["correct"], r["predicted"]))
+    
+    hardness = {}
+    for query, runs in outcomes.items():
+        failure_rate = sum(1 for correct, _ in runs if not correct) / len(runs)
+        unstable = len({predicted for _, predicted in runs}) > 1
+        hardness[query] = 1.0 if unstable else failure_rate
+    return hardness
+
+def allocate_budget(sizes: Dict[Tuple[str, str], int], budget: int) -> Dict[Tuple[str, str], int]:
+    """Proportional allocation with at least one case per stratum (largest remainder)"""
+    total = sum(sizes.values())
+    if budget >= total:
+        return dict(sizes)
+    
+    floor = 1 if budget >= len(sizes) else 0
+    spare = budget - floor * len(sizes)
+    quotas = {h: spare * n / total for h, n in sizes.items()}
+    alloc = {h: min(n, floor + int(quotas[h])) for h, n in sizes.items()}
+    
+    # Hand out what is left by largest remainder, skipping full strata
+    by_remainder = sorted(sizes, key=lambda h: quotas[h] - int(quotas[h]), reverse=True)
+    while sum(alloc.values()) < budget:
+        for h in by_remainder:
+            if sum(alloc.values()) >= budget:
+                break
+            if alloc[h] < sizes[h]:
+                alloc[h] += 1
+    return alloc
+
+def inclusion_probabilities(weights: List[float], n: int) -> List[float]:
+    """Probabilities proportional to weight summing to n, capped at 1"""
+    probs = [0.0] * len(weights)
+    capped = set()
+    while True:
+        remaining = n - len(capped)
+        free_weight = sum(w for i, w in enumerate(weights) if i not in capped)
+        newly_capped = False
+        for i, w in enumerate(weights):
+            if i in capped:
+                continue
+            probs[i] = remaining * w / free_weight
+            if probs[i] >= 1.0:
+                capped.add(i)
+                newly_capped = True
+        if not newly_capped:
+            break
+    return [1.0 if i in capped else p for i, p in enumerate(probs)]
+
+def stratified_sample(test_cases: List[TestCase], config: SamplingConfig,
+                      hardness: Optional[Dict[str, float]] = None) -> List[Tuple[TestCase, float]]:
+    """Draw a fixed-budget subset stratified by category and difficulty
+    
+    Within each stratum, cases are drawn by systematic PPS sampling with
+    probability proportional to 1 + hard_boost * hardness, which gives exact
+    inclusion probabilities. Returns (test_case, inclusion_probability) pairs
+    so metrics can be reweighted by 1 / probability (Horvitz-Thompson).
+    """
+    rng = random.Random(config.seed)
+    hardness = hardness or {}
+    strata = defaultdict(list)
+    for tc in test_cases:
+        strata[(tc.category, tc.difficulty)].append(tc)
+    
+    alloc = allocate_budget({h: len(cases) for h, cases in strata.items()}, config.budget)
+    
+    sample = []
+    for h, cases in strata.items():
+        n = alloc[h]
+        if n == 0:
+            continue
+        cases = list(cases)
+        rng.shuffle(cases)
+        weights = [1 + config.hard_boost * hardness.get(tc.query, 0.0) for tc in cases]
+        probs = inclusion_probabilities(weights, n)
+        
+        # Systematic sampling over the cumulative probabilities
+        step_point = rng.random()
+        cumulative = 0.0
+        for tc, p in zip(cases, probs):
+            before = cumulative
+            cumulative += p
+            if math.floor(cumulative - step_point) > math.floor(before - step_point):
+                sample.append((tc, p))
+    
+    return sample
+
+def load_conversations(filename: str) -> List[Conversation]:
+    """Load conversations from JSONL: {"conversation_id": ..., "turns": [{"role", "content", "expected"?, ...}]}"""
+    conversations = []
+    with open(filename) as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                turns = [ConversationTurn(**turn) for turn in row["turns"]]
+                conversations.append(Conversation(row["conversation_id"], turns))
+    return conversations
+
+def split_prompt_template(template: str) -> Tuple[str, str]:
+    """Split the intent prompt into static instructions and a per-message part
+    
+    The instructions go first as a system message so their KV cache is shared
+    by every request; only the short per-message part follows the history.
+    """
+    marker = 'User message: "{message}"'
+    if marker not in template:
+        return "", template
+    
+    before, after = template.split(marker, 1)
+    after = after.strip()
+    if after.endswith("JSON Response:"):
+        after = after[:-len("JSON Response:")].rstrip()
+    instructions = (f"{before.strip()}\n\n{after}\n\n"
+                    "Earlier turns of the conversation are included for context. "
+                    "Classify only the final user message.")
+    return instructions, f"{marker}\n\nJSON Response:"
+
+def shared_prefix_length(a: List[Dict], b: List[Dict]) -> int:
+    """Characters of rendered message content two requests have in common from the start"""
+    shared = 0
+    for left, right in zip(a, b):
+        if left == right:
+            shared += len(left["content"])
+            continue
+        if left["role"] == right["role"]:
+            shared += len(os.path.commonprefix([left["content"], right["content"]]))
+        break
+    return shared
+
+def build_multi_query_prompt(template: str, queries: List[str]) -> str:
+    """Turn the single-message intent prompt into one that classifies several messages"""
+    listing = "\n".join(f'{i}. {json.dumps(q)}' for i, q in enumerate(queries, 1))
+    prompt = template.replace('User message: "{message}"', f"User messages:\n{listing}")
+    if prompt == template:
+        prompt = f"{template}\n\nUser messages:\n{listing}"
+    
+    array_format = (
+        "Respond with ONLY a valid JSON array containing one object per message, in the same order, "
+        "where \"id\" is the message number:\n"
+        "[\n"
+        '  {"id": 1, "isSearch": boolean, "searchQuery": "extracted search terms or null", '
+        '"confidence": number between 0 and 1, "reasoning": "brief explanation"}\n'
+        "]\n"
+    )
+    prompt, replaced = re.subn(r'Respond with ONLY valid JSON in this exact format:\s*\{.*?\}\n',
+                               lambda _: array_format, prompt, count=1, flags=re.DOTALL)
+    if not replaced:
+        prompt = prompt.replace("JSON Response:", array_format + "\nJSON Response:")
+    return prompt
+
 class IntentEvaluator:
-    def __init__(self):
+    def __init__(self, tracer=NULL_TRACER, engine_profile: Optional[Dict] = None,
+                 request_policy: Optional[RequestPolicy] = None, server_url: Optional[str] = None):
         self.engine = None
+        self.server_url = server_url
+        self.engine_lock = threading.Lock()
         self.model_path = None
+        self.tracer = tracer
+        self.engine_profile = engine_profile
+        self.request_policy = request_policy or RequestPolicy()
+        self.call_stats = Counter()
+        self.dropped: List[Dict] = []
+        self.stats_lock = threading.Lock()
+        self.local = threading.local()
         self.prompt_template = load_prompt_from_typescript()
+        self.prompt_hash = hashlib.sha256(self.prompt_template.encode('utf-8')).hexdigest()[:16]
+        self.run_id = uuid.uuid4().hex
+        self.started_at = time.time()
         self.results: List[EvalResult] = []
-        self.find_model_path()
+        self.adaptive_summary: Optional[Dict] = None
+        self.sampling_summary: Optional[Dict] = None
+        self.stratum_sizes: Dict[Tuple[str, str], int] = {}
+        self.stratum_samples: Dict[Tuple[str, str], int] = {}
+        self.turn_stats: List[Dict] = []
+        self.multi_query_summary: List[Dict] = []
+        if not server_url:
+            self.find_model_path()
     
     def find_model_path(self):
         """Find the local model path"""
@@ -215,38 +555,173 @@ class IntentEvaluator:
         sys.exit(1)
     
     def init_engine(self):
-        """Initialize the MLC engine"""
-        if not MLC_AVAILABLE:
+        """Initialize the MLC engine (or the client for --server-url)"""
+        if not MLC_AVAILABLE and not self.server_url:
             print("❌ MLC LLM not available")
             return False
             
-        if self.engine is None:
-            print("🚀 Initializing MLC Engine...")
-            try:
-                self.engine = MLCEngine(self.model_path)
-                print("✅ Engine initialized successfully")
-                return True
-            except Exception as e:
-                print(f"❌ Failed to initialize engine: {e}")
-                return False
+        with self.engine_lock:
+            if self.engine is None and self.server_url:
+                print(f"🌐 Using OpenAI-compatible server at {self.server_url}")
+                # Reads on a stalled server fail at the request deadline instead of hanging the worker
+                self.engine = HTTPEngine(self.server_url, timeout=self.request_policy.timeout or DEFAULT_TIMEOUT)
+            elif self.engine is None:
+                print(f"🚀 Initializing MLC Engine ({describe_profile(self.engine_profile)})...")
+                try:
+                    self.engine = MLCEngine(self.model_path, **engine_kwargs(self.engine_profile))
+                    print("✅ Engine initialized successfully")
+                    return True
+                except Exception as e:
+                    print(f"❌ Failed to initialize engine: {e}")
+                    return False
         return True
     
-    def call_model(self, prompt: str, temperature: float = 0.1) -> Optional[str]:
-        """Call the model with the given prompt"""
-        if not self.init_engine():
-            return None
+    def restart_engine(self, wedged) -> None:
+        """Drop a wedged engine so the next call builds a fresh one"""
+        with self.engine_lock:
+            if self.engine is not wedged:
+                return  # another request already replaced it
+            self.engine = None
+        self.count("restarts")
+        print("🔄 Engine stopped responding, restarting it")
+        # terminate() joins the engine's threads, which may be the ones stuck
+        threading.Thread(target=wedged.terminate, daemon=True).start()
+    
+    def count(self, key: str) -> None:
+        with self.stats_lock:
+            self.call_stats[key] += 1
+    
+    def call_with_deadline(self, request: Callable, label: str = "Model call"):
+        """Run request(engine, cancel) under the request policy
+        
+        Each attempt runs on a worker thread and gets policy.timeout seconds.
+        On timeout the cancel event is set, which aborts a streaming request at
+        its next chunk; if the attempt still hasn't returned restart_after
+        seconds later the engine is wedged and gets replaced. Failed attempts
+        are retried with exponential backoff and jitter.
+        """
+        policy = self.request_policy
+        self.local.failure = None
+        for attempt in range(policy.max_retries + 1):
+            if attempt:
+                delay = min(policy.max_backoff, policy.backoff * 2 ** (attempt - 1))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                self.count("retries")
+            if not self.init_engine():
+                self.local.failure = "engine unavailable"
+                return None
+            
+            engine = self.engine
+            cancel = threading.Event()
+            outcome = {}
+            
+            def run_attempt():
+                try:
+                    outcome["value"] = request(engine, cancel)
+                except Exception as e:
+                    outcome["error"] = e
+            
+            self.count("calls")
+            worker = threading.Thread(target=run_attempt, daemon=True)
+            worker.start()
+            worker.join(policy.timeout)
+            
+            if not worker.is_alive():
+                if "error" not in outcome:
+                    return outcome["value"]
+                self.count("errors")
+                self.local.failure = f"model error: {outcome['error']}"
+                print(f"❌ {label} failed: {outcome['error']}")
+                continue
             
+            cancel.set()
+            self.count("timeouts")
+            self.local.failure = f"timed out after {policy.timeout:g}s"
+            print(f"⏱️  {label} exceeded its {policy.timeout:g}s deadline, cancelled")
+            worker.join(policy.restart_after)
+            if worker.is_alive():
+                self.restart_engine(engine)
+        return None
+    
+    def stream_chat(self, engine, messages: List[Dict], temperature: float, max_tokens: int,
+                    cancel: threading.Event) -> Dict:
+        """Stream one chat completion, stopping early once cancel is set"""
+        start = time.perf_counter()
+        first_token_at = None
+        chunks = []
+        usage = None
+        request_id = None
+        stream = engine.chat.completions.create(
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
         try:
-            response = self.engine.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=200,
-                stream=False
+            for chunk in stream:
+                if cancel.is_set():
+                    if request_id and hasattr(engine, "abort"):
+                        engine.abort(request_id)
+                    break
+                request_id = getattr(chunk, "id", None)
+                # The final chunk only carries usage information
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    chunks.append(delta)
+        finally:
+            # Closing the generator releases the request inside the engine
+            if hasattr(stream, "close"):
+                stream.close()
+        end = time.perf_counter()
+        return {
+            "content": "".join(chunks),
+            "start": start,
+            "first_token_at": first_token_at or end,
+            "end": end,
+            "usage": usage,
+        }
+    
+    def call_model(self, prompt: str, temperature: float = 0.1, max_tokens: int = 200) -> Optional[str]:
+        """Call the model with the given prompt"""
+        with self.tracer.span("generate"):
+            outcome = self.call_with_deadline(
+                lambda engine, cancel: self.stream_chat(
+                    engine, [{"role": "user", "content": prompt}], temperature, max_tokens, cancel
+                )
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"❌ Model call failed: {e}")
+        return outcome["content"] if outcome else None
+    
+    def call_model_stream(self, prompt: str, temperature: float = 0.1) -> Optional[Tuple[str, float]]:
+        """Call the model with streaming, returning the content and time to first token (seconds)"""
+        outcome = self.call_chat([{"role": "user", "content": prompt}], temperature)
+        return (outcome["content"], outcome["ttft"]) if outcome else None
+    
+    def call_chat(self, messages: List[Dict], temperature: float = 0.1, max_tokens: int = 200) -> Optional[Dict]:
+        """Stream a chat completion, returning content, ttft, latency (seconds) and usage"""
+        outcome = self.call_with_deadline(
+            lambda engine, cancel: self.stream_chat(engine, messages, temperature, max_tokens, cancel)
+        )
+        if outcome is None:
             return None
+        
+        start, first_token_at, end = outcome["start"], outcome["first_token_at"], outcome["end"]
+        if self.tracer.enabled:
+            # Engine-side queueing is folded into prefill: the client cannot see it
+            self.tracer.complete("prefill", start, first_token_at)
+            self.tracer.complete("decode", first_token_at, end)
+        return {
+            "content": outcome["content"],
+            "ttft": first_token_at - start,
+            "latency": end - start,
+            "usage": outcome["usage"],
+        }
     
     def parse_response(self, response: str) -> Dict:
         """Parse JSON response from model"""
@@ -260,72 +735,165 @@ class IntentEvaluator:
             
             json_text = json_match.group()
             parsed = json.loads(json_text)
-            
-            if "isSearch" not in parsed or not isinstance(parsed["isSearch"], bool):
-                return {"error": "Invalid isSearch field", "raw": response}
-            
-            if "confidence" not in parsed or not (0 <= parsed["confidence"] <= 1):
-                return {"error": "Invalid confidence field", "raw": response}
-            
-            # Convert to standard format
-            parsed["intentCategory"] = "action" if parsed["isSearch"] else "chat"
-            return parsed
+            return self.validate_verdict(parsed, response)
             
         except json.JSONDecodeError as e:
             return {"error": f"JSON parse error: {e}", "raw": response}
         except Exception as e:
             return {"error": f"Parse error: {e}", "raw": response}
     
-    def evaluate_test_case(self, test_case: TestCase, temperature: float = 0.1, verbose: bool = True) -> Optional[EvalResult]:
-        """Evaluate a single test case"""
-        if verbose:
-            print(f"\n🧪 Testing: \"{test_case.query}\" ({test_case.category}, {test_case.difficulty})")
+    def validate_verdict(self, parsed: Dict, response: str) -> Dict:
+        """Check one verdict object and convert it to the standard format"""
+        if "isSearch" not in parsed or not isinstance(parsed["isSearch"], bool):
+            return {"error": "Invalid isSearch field", "raw": response}
+        
+        confidence = parsed.get("confidence")
+        if not isinstance(confidence, (int, float)) or not (0 <= confidence <= 1):
+            return {"error": "Invalid confidence field", "raw": response}
         
-        # Build prompt
-        prompt = self.prompt_template.replace('{message}', test_case.query)
+        parsed["intentCategory"] = "action" if parsed["isSearch"] else "chat"
+        return parsed
+    
+    def parse_multi_response(self, response: str, count: int) -> Dict[int, Dict]:
+        """Parse a JSON array of verdicts, returning {position: verdict} for the valid ones
         
-        # Call model
-        response = self.call_model(prompt, temperature)
+        Verdicts are matched by their "id" field (1-based); items with a missing,
+        invalid, out-of-range or repeated id are skipped, so only their messages
+        are re-queried. Only when no item carries an id are verdicts matched by
+        position, and then only if there is exactly one per message. Broken
+        arrays fall back to picking out the individual objects.
+        """
         if not response:
-            return None
+            return {}
         
-        # Parse response
-        parsed = self.parse_response(response)
+        items = None
+        start, end = response.find('['), response.rfind(']')
+        if start != -1 and end > start:
+            try:
+                items = json.loads(response[start:end + 1])
+            except json.JSONDecodeError:
+                items = None
+        if not isinstance(items, list):
+            items = []
+            for match in re.finditer(r'\{[^{}]*\}', response):
+                try:
+                    items.append(json.loads(match.group()))
+                except json.JSONDecodeError:
+                    continue
         
-        if "error" in parsed:
-            if verbose:
-                print(f"   ❌ Parse Error: {parsed['error']}")
-            return None
+        items = [item for item in items if isinstance(item, dict)]
+        if any("id" in item for item in items):
+            def position(item: Dict) -> Optional[int]:
+                value = item.get("id")
+                if isinstance(value, str) and value.strip().isdigit():
+                    value = int(value)
+                if isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= count:
+                    return value - 1
+                return None
+            
+            positions = Counter(position(item) for item in items)
+            positioned = {position(item): item for item in items
+                          if position(item) is not None and positions[position(item)] == 1}
+        elif len(items) == count:
+            positioned = dict(enumerate(items))
+        else:
+            return {}
         
-        # Create result
-        predicted = parsed.get('intentCategory', 'ERROR')
-        correct = predicted == test_case.expected
+        verdicts = {}
+        for position, item in positioned.items():
+            verdict = self.validate_verdict(item, response)
+            if "error" not in verdict:
+                verdicts[position] = verdict
+        return verdicts
+    
+    def evaluate_test_case(self, test_case: TestCase, temperature: float = 0.1, verbose: bool = True) -> Optional[EvalResult]:
+        """Evaluate a single test case"""
+        if verbose:
+            print(f"\n🧪 Testing: \"{test_case.query}\" ({test_case.category}, {test_case.difficulty})")
         
-        result = EvalResult(
+        with self.tracer.span("test_case", query=test_case.query, category=test_case.category,
+                              difficulty=test_case.difficulty):
+            # Build prompt
+            with self.tracer.span("render_prompt"):
+                prompt = self.prompt_template.replace('{message}', test_case.query)
+            
+            # Call model (when tracing, via call_chat so prefill and decode are recorded separately)
+            if self.tracer.enabled:
+                outcome = self.call_model_stream(prompt, temperature)
+                response = outcome[0] if outcome else None
+            else:
+                response = self.call_model(prompt, temperature)
+            if not response:
+                self.drop_case(test_case, getattr(self.local, "failure", None) or "empty response")
+                return None
+            
+            # Parse response
+            with self.tracer.span("parse"):
+                parsed = self.parse_response(response)
+            
+            if "error" in parsed:
+                if verbose:
+                    print(f"   ❌ Parse Error: {parsed['error']}")
+                self.drop_case(test_case, parsed['error'])
+                return None
+            
+            result = self.build_result(test_case, parsed, response)
+            
+            if verbose:
+                self.print_result(result)
+            
+            return result
+    
+    def drop_case(self, test_case: TestCase, reason: str) -> None:
+        """Record a case that produced no usable verdict"""
+        with self.stats_lock:
+            self.call_stats["dropped"] += 1
+            self.dropped.append({
+                "query": test_case.query,
+                "category": test_case.category,
+                "difficulty": test_case.difficulty,
+                "reason": reason,
+            })
+    
+    def build_result(self, test_case: TestCase, parsed: Dict, response: str) -> EvalResult:
+        """Score a parsed verdict against its test case"""
+        predicted = parsed.get('intentCategory', 'ERROR')
+        return EvalResult(
             query=test_case.query,
             expected=test_case.expected,
             predicted=predicted,
             confidence=parsed.get('confidence', 0.0),
             reasoning=parsed.get('reasoning', ''),
             raw_response=response,
-            correct=correct,
+            correct=predicted == test_case.expected,
             category=test_case.category,
             difficulty=test_case.difficulty,
             notes=test_case.notes
         )
+    
+    def print_result(self, result: EvalResult) -> None:
+        status = "✅ CORRECT" if result.correct else "❌ WRONG"
+        print(f"   Predicted: {result.predicted} (confidence: {result.confidence:.2f}) → {status}")
+        if not result.correct:
+            print(f"   Expected: {result.expected}")
+            print(f"   Reasoning: {result.reasoning}")
+    
+    def run_full_evaluation(self, temperature: float = 0.1, dataset_filter: str = None, verbose: bool = True,
+                            adaptive: Optional[AdaptiveConfig] = None,
+                            test_cases: Optional[List[TestCase]] = None,
+                            sampling: Optional[SamplingConfig] = None) -> List[EvalResult]:
+        """Run evaluation on all or filtered test cases
         
-        if verbose:
-            status = "✅ CORRECT" if correct else "❌ WRONG"
-            print(f"   Predicted: {predicted} (confidence: {result.confidence:.2f}) → {status}")
-            if not correct:
-                print(f"   Expected: {test_case.expected}")
-                print(f"   Reasoning: {result.reasoning}")
+        With a SamplingConfig, only a stratified, importance-weighted subset is
+        evaluated and each result carries the weight needed to estimate
+        full-corpus metrics (see calculate_weighted_metrics).
         
-        return result
-    
-    def run_full_evaluation(self, temperature: float = 0.1, dataset_filter: str = None, verbose: bool = True) -> List[EvalResult]:
-        """Run evaluation on all or filtered test cases"""
-        test_cases = COMPREHENSIVE_TEST_CASES
+        With an AdaptiveConfig, cases are drawn in randomized category-stratified
+        order and the run stops as soon as the confidence intervals are tight
+        enough (or the comparison against a baseline run is decided).
+        """
+        if test_cases is None:
+            test_cases = COMPREHENSIVE_TEST_CASES
         
         if dataset_filter:
             test_cases = [tc for tc in test_cases if dataset_filter in tc.category]
@@ -333,18 +901,407 @@ class IntentEvaluator:
         else:
             print(f"📊 Running full evaluation on {len(test_cases)} test cases")
         
+        weights = {}
+        if sampling:
+            hardness = load_query_hardness(sampling.history) if sampling.history else None
+            sample = stratified_sample(test_cases, sampling, hardness)
+            weights = {id(tc): 1 / p for tc, p in sample}
+            self.stratum_sizes = Counter((tc.category, tc.difficulty) for tc in test_cases)
+            self.stratum_samples = Counter((tc.category, tc.difficulty) for tc, _ in sample)
+            self.sampling_summary = {
+                "population_size": len(test_cases),
+                "sample_size": len(sample),
+                "strata": len(self.stratum_sizes),
+                "hard_boost": sampling.hard_boost if hardness else 0.0,
+            }
+            if sampling.budget < len(self.stratum_sizes):
+                print(f"⚠️  Budget {sampling.budget} is smaller than the {len(self.stratum_sizes)} strata; "
+                      f"unsampled strata will be reported as unestimated")
+            test_cases = [tc for tc, _ in sample]
+            print(f"🎲 Sampled {len(test_cases)}/{self.sampling_summary['population_size']} cases "
+                  f"across {self.sampling_summary['strata']} strata")
+        
+        baseline = None
+        status = None
+        if adaptive:
+            test_cases = stratified_order(test_cases, random.Random(adaptive.seed))
+            if adaptive.baseline_results:
+                baseline = load_baseline_correctness(adaptive.baseline_results)
+            print(f"🎯 Adaptive mode: stopping at CI width ≤ {adaptive.ci_width} ({adaptive.confidence_level:.0%} confidence)")
+        
         results = []
+        calls = 0
+        looks = 0
+        next_check = 0
         for i, test_case in enumerate(test_cases, 1):
             if verbose:
                 print(f"\nProgress: {i}/{len(test_cases)}")
             
             result = self.evaluate_test_case(test_case, temperature, verbose)
-            if result:
+            calls += 1
+            if result is None:
+                # Score cases without a usable verdict as errors, so metrics cover every case
+                result = self.build_result(test_case, {"reasoning": self.dropped[-1]["reason"]}, "")
+            result.weight = weights.get(id(test_case), 1.0)
+            results.append(result)
+            
+            if adaptive and len(results) >= max(adaptive.min_samples, next_check):
+                looks += 1
+                status = self.adaptive_status(results, adaptive, baseline, looks)
+                # Geometric spacing keeps the number of checks (and bootstraps) logarithmic
+                next_check = max(len(results) + adaptive.check_every,
+                                 math.ceil(len(results) * (1 + adaptive.check_growth)))
+                if verbose:
+                    print(f"   📐 Accuracy CI width: {status['accuracy_ci'][1] - status['accuracy_ci'][0]:.3f}, "
+                          f"F1 CI width: {status['f1_ci'][1] - status['f1_ci'][0]:.3f}")
+                if status["stop"]:
+                    break
+        
+        if adaptive:
+            if status is None or not status["stop"]:
+                looks += 1
+                status = self.adaptive_status(results, adaptive, baseline, looks)
+            status["looks"] = looks
+            status["model_calls"] = calls
+            status["calls_saved"] = len(test_cases) - calls
+            status["total_cases"] = len(test_cases)
+            self.adaptive_summary = status
+        
+        self.results = results
+        return results
+    
+    def adaptive_status(self, results: List[EvalResult], config: AdaptiveConfig,
+                        baseline: Optional[Dict[str, bool]] = None, look: int = 1) -> Dict:
+        """Current confidence bounds and whether the adaptive stopping rule is met
+        
+        Intervals for the look-th check are widened by alpha spending (see
+        look_confidence), since the stopping rule is re-tested at every check.
+        """
+        confidence = look_confidence(config.confidence_level, look)
+        z = z_score(confidence)
+        correct = sum(1 for r in results if r.correct)
+        accuracy_ci = wilson_interval(correct, len(results), z)
+        
+        # Percentile bootstrap for F1, which has no simple closed-form interval.
+        # F1 only depends on the tp/fp/fn counts, so resample those instead of results.
+        rng = random.Random(config.seed)
+        tp = sum(1 for r in results if r.expected == "action" and r.predicted == "action")
+        fp = sum(1 for r in results if r.expected == "chat" and r.predicted == "action")
+        fn = sum(1 for r in results if r.expected == "action" and r.predicted == "chat")
+        counts = [tp, fp, fn, len(results) - tp - fp - fn]
+        boot = []
+        for _ in range(config.bootstrap_samples if results else 0):
+            drawn = Counter(rng.choices(range(4), weights=counts, k=len(results)))
+            boot.append(f1_from_counts(drawn[0], drawn[1], drawn[2]))
+        boot = sorted(boot) or [0.0]
+        alpha = (1 - confidence) / 2
+        f1_ci = (boot[int(alpha * (len(boot) - 1))], boot[int((1 - alpha) * (len(boot) - 1))])
+        
+        status = {
+            "evaluated": len(results),
+            "accuracy": correct / len(results) if results else 0.0,
+            "accuracy_ci": accuracy_ci,
+            "f1": f1_from_counts(tp, fp, fn),
+            "f1_ci": f1_ci,
+            "confidence_level": confidence,
+            "stop": (accuracy_ci[1] - accuracy_ci[0] <= config.ci_width
+                     and f1_ci[1] - f1_ci[0] <= config.ci_width),
+            "reason": "confidence intervals within target width",
+        }
+        
+        if baseline is not None:
+            # Paired difference on the queries both runs scored, with the
+            # Agresti-Min adjustment so zero discordant pairs still leave uncertainty
+            pairs = [(r.correct, baseline[r.query]) for r in results if r.query in baseline]
+            if len(pairs) >= max(2, config.min_samples):
+                gained = sum(1 for now, before in pairs if now and not before) + 0.5
+                lost = sum(1 for now, before in pairs if before and not now) + 0.5
+                n = len(pairs) + 2
+                mean = (gained - lost) / n
+                margin = z * math.sqrt((gained + lost) - (gained - lost) ** 2 / n) / n
+                status["paired"] = {
+                    "pairs": len(pairs),
+                    "accuracy_delta": mean,
+                    "delta_ci": (mean - margin, mean + margin),
+                }
+                if mean - margin > 0 or mean + margin < 0:
+                    status["stop"] = True
+                    status["reason"] = "paired comparison against baseline is significant"
+                elif 2 * margin <= config.ci_width:
+                    status["stop"] = True
+                    status["reason"] = "paired comparison shows no difference beyond target width"
+                else:
+                    status["stop"] = False
+            else:
+                status["stop"] = False
+        
+        return status
+    
+    def evaluate_multi_query(self, test_cases: List[TestCase], temperature: float = 0.1,
+                             max_retries: int = 2, verbose: bool = True) -> Tuple[List[EvalResult], Dict]:
+        """Classify several test cases with one generation
+        
+        Verdicts missing from a partial or misaligned array are retried on
+        their own, as a smaller batch, up to max_retries times.
+        """
+        results: Dict[int, EvalResult] = {}
+        pending = list(range(len(test_cases)))
+        stats = {"calls": 0, "retried": 0, "dropped": 0, "prompt_chars": 0}
+        
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                stats["retried"] += len(pending)
+            batch = [test_cases[i] for i in pending]
+            
+            with self.tracer.span("multi_query", size=len(batch), attempt=attempt):
+                if len(batch) == 1:
+                    prompt = self.prompt_template.replace('{message}', batch[0].query)
+                    response = self.call_model(prompt, temperature)
+                    parsed = self.parse_response(response)
+                    verdicts = {} if "error" in parsed else {0: parsed}
+                else:
+                    prompt = build_multi_query_prompt(self.prompt_template, [tc.query for tc in batch])
+                    # Leave room for one verdict object per message
+                    response = self.call_model(prompt, temperature, max_tokens=80 * len(batch) + 50)
+                    verdicts = self.parse_multi_response(response, len(batch))
+            stats["calls"] += 1
+            stats["prompt_chars"] += len(prompt)
+            
+            for position, verdict in verdicts.items():
+                index = pending[position]
+                results[index] = self.build_result(test_cases[index], verdict, response)
+            pending = [index for position, index in enumerate(pending) if position not in verdicts]
+            
+            if verbose and pending:
+                print(f"   ⚠️  {len(pending)}/{len(batch)} verdicts missing or invalid")
+        
+        # Score cases that never got a usable verdict as errors, like run_full_evaluation does
+        for index in pending:
+            reason = getattr(self.local, "failure", None) or f"no valid verdict after {max_retries + 1} attempts"
+            self.drop_case(test_cases[index], reason)
+            results[index] = self.build_result(test_cases[index], {"reasoning": reason}, "")
+        stats["dropped"] = len(pending)
+        return [results[i] for i in sorted(results)], stats
+    
+    def run_multi_query_evaluation(self, batch_sizes: List[int], temperature: float = 0.1,
+                                   dataset_filter: str = None, verbose: bool = True,
+                                   test_cases: Optional[List[TestCase]] = None) -> List[EvalResult]:
+        """Sweep the number of queries packed into one prompt
+        
+        K=1 uses the normal single-message prompt, so it is the baseline the
+        accuracy loss of larger K is measured against.
+        """
+        if test_cases is None:
+            test_cases = COMPREHENSIVE_TEST_CASES
+        if dataset_filter:
+            test_cases = [tc for tc in test_cases if dataset_filter in tc.category]
+        print(f"📦 Running multi-query sweep over K={batch_sizes} on {len(test_cases)} test cases")
+        
+        self.multi_query_summary = []
+        results = []
+        for k in batch_sizes:
+            results = []
+            stats = {"calls": 0, "retried": 0, "dropped": 0, "prompt_chars": 0}
+            # Request health is reported per K, and the last K's matches the exported results
+            self.call_stats = Counter()
+            self.dropped = []
+            start = time.perf_counter()
+            for offset in range(0, len(test_cases), k):
+                chunk = test_cases[offset:offset + k]
+                if verbose:
+                    print(f"\nK={k}: cases {offset + 1}-{offset + len(chunk)}/{len(test_cases)}")
+                if k == 1:
+                    prompt = self.prompt_template.replace('{message}', chunk[0].query)
+                    result = self.evaluate_test_case(chunk[0], temperature, verbose=False)
+                    stats["calls"] += 1
+                    stats["prompt_chars"] += len(prompt)
+                    if result is None:
+                        stats["dropped"] += 1
+                        result = self.build_result(chunk[0], {"reasoning": self.dropped[-1]["reason"]}, "")
+                    chunk_results = [result]
+                else:
+                    chunk_results, chunk_stats = self.evaluate_multi_query(chunk, temperature, verbose=verbose)
+                    for key, value in chunk_stats.items():
+                        stats[key] += value
+                results.extend(chunk_results)
+                if verbose:
+                    for result in chunk_results:
+                        print(f"   \"{result.query}\" → {result.predicted} {'✅' if result.correct else '❌'}")
+            elapsed = time.perf_counter() - start
+            
+            metrics = self.calculate_metrics(results)
+            self.multi_query_summary.append(dict(
+                stats,
+                k=k,
+                cases=len(test_cases),
+                scored=len(results),
+                accuracy=metrics.get("accuracy", 0.0),
+                f1_score=metrics.get("f1_score", 0.0),
+                request_stats=dict(self.call_stats),
+                seconds_per_query=elapsed / len(test_cases) if test_cases else 0.0,
+                prompt_chars_per_query=stats["prompt_chars"] / len(test_cases) if test_cases else 0.0,
+            ))
+        
+        self.results = results
+        return results
+    
+    def print_multi_query_report(self) -> None:
+        """Per-query latency and prompt cost against accuracy for each K"""
+        if not self.multi_query_summary:
+            return
+        baseline = self.multi_query_summary[0]
+        print(f"\n📦 MULTI-QUERY SWEEP (accuracy change vs K={baseline['k']}):")
+        print(f"   {'K':>3s} {'s/query':>8s} {'chars/query':>12s} {'calls':>6s} {'retried':>8s} {'dropped':>8s} {'accuracy':>9s} {'change':>8s}")
+        for row in self.multi_query_summary:
+            print(f"   {row['k']:3d} {row['seconds_per_query']:8.3f} {row['prompt_chars_per_query']:12.0f} "
+                  f"{row['calls']:6d} {row['retried']:8d} {row['dropped']:8d} "
+                  f"{row['accuracy']:9.1%} {row['accuracy'] - baseline['accuracy']:+8.1%}")
+    
+    def run_conversation_evaluation(self, conversations: List[Conversation], temperature: float = 0.1,
+                                    verbose: bool = True, cold_baseline: bool = False) -> List[EvalResult]:
+        """Classify each scored user turn with the earlier turns as context
+        
+        Requests are laid out as [instructions, turn 1, ..., turn t-1, message t],
+        so each one shares its prefix with the conversation's previous request
+        and the engine's prefix cache only prefills the newest turns. Turns of a
+        conversation run back to back to keep that prefix hot. With
+        cold_baseline, each turn is sent again with a cache-busting nonce to
+        measure the latency the reuse saves.
+        """
+        instructions, user_template = split_prompt_template(self.prompt_template)
+        scored = sum(1 for c in conversations for t in c.turns if t.role == "user" and t.expected)
+        print(f"💬 Running conversation evaluation: {len(conversations)} conversations, {scored} scored turns")
+        
+        results = []
+        self.turn_stats = []
+        previous: List[Dict] = []
+        for conversation in conversations:
+            for index, turn in enumerate(conversation.turns):
+                if turn.role != "user" or not turn.expected:
+                    continue
+                
+                messages = [{"role": "system", "content": instructions}] if instructions else []
+                messages += [{"role": t.role, "content": t.content} for t in conversation.turns[:index]]
+                messages.append({"role": "user", "content": user_template.replace('{message}', turn.content)})
+                
+                if verbose:
+                    print(f"\n🧪 [{conversation.conversation_id} #{index}] \"{turn.content}\" ({turn.category}, {turn.difficulty})")
+                case = TestCase(turn.content, turn.expected, turn.category, turn.difficulty, turn.notes)
+                
+                with self.tracer.span("turn", conversation=conversation.conversation_id, turn=index,
+                                      category=turn.category, difficulty=turn.difficulty):
+                    outcome = self.call_chat(messages, temperature)
+                    if outcome is None:
+                        # Score the turn as an error so metrics cover every scored turn
+                        reason = getattr(self.local, "failure", None) or "empty response"
+                        self.drop_case(case, reason)
+                        results.append(self.build_result(case, {"reasoning": reason}, ""))
+                        if verbose:
+                            print(f"   ❌ No response: {reason}")
+                        continue
+                    with self.tracer.span("parse"):
+                        parsed = self.parse_response(outcome["content"])
+                
+                stats = self.turn_usage(outcome, messages, previous)
+                stats.update(conversation_id=conversation.conversation_id, turn=index, category=turn.category)
+                previous = messages
+                
+                if cold_baseline:
+                    busted = [dict(messages[0], content=f"[{uuid.uuid4().hex}] {messages[0]['content']}")] + messages[1:]
+                    cold = self.call_chat(busted, temperature)
+                    if cold:
+                        stats["cold_ttft"] = cold["ttft"]
+                        stats["ttft_saved"] = cold["ttft"] - outcome["ttft"]
+                self.turn_stats.append(stats)
+                
+                if "error" in parsed:
+                    if verbose:
+                        print(f"   ❌ Parse Error: {parsed['error']}")
+                    self.drop_case(case, parsed['error'])
+                    results.append(self.build_result(case, {"reasoning": parsed['error']}, outcome["content"]))
+                    continue
+                
+                result = self.build_result(case, parsed, outcome["content"])
                 results.append(result)
+                
+                if verbose:
+                    status = "✅ CORRECT" if result.correct else "❌ WRONG"
+                    reused = stats['reused_tokens']
+                    print(f"   Predicted: {result.predicted} (confidence: {result.confidence:.2f}) → {status}")
+                    print(f"   Prompt tokens: {stats['prompt_tokens']}, reused from cache: "
+                          f"{'n/a' if reused is None else reused}, ttft: {stats['ttft'] * 1000:.0f}ms")
         
         self.results = results
         return results
     
+    def turn_usage(self, outcome: Dict, messages: List[Dict], previous: List[Dict]) -> Dict:
+        """Prompt tokens, tokens actually prefilled and tokens reused for one turn
+        
+        MLC reports the tokens it really prefilled in usage.extra; when a
+        backend does not, reuse is estimated from the prefix shared with the
+        previous request.
+        """
+        usage = outcome["usage"]
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        extra = getattr(usage, "extra", None) or {}
+        prefill_tokens = extra.get("prefill_tokens")
+        estimated = False
+        
+        if prompt_tokens is not None and prefill_tokens is not None:
+            reused = prompt_tokens - prefill_tokens
+        elif prompt_tokens:
+            total_chars = sum(len(m["content"]) for m in messages) or 1
+            reused = round(prompt_tokens * shared_prefix_length(previous, messages) / total_chars)
+            prefill_tokens = prompt_tokens - reused
+            estimated = True
+        else:
+            reused = None
+        
+        return {
+            "prompt_tokens": prompt_tokens,
+            "prefill_tokens": prefill_tokens,
+            "reused_tokens": reused,
+            "estimated": estimated,
+            "ttft": outcome["ttft"],
+            "latency": outcome["latency"],
+        }
+    
+    def print_conversation_report(self, results: List[EvalResult] = None) -> None:
+        """Per-turn prefix reuse and latency, plus accuracy on context-dependent turns"""
+        if results is None:
+            results = self.results
+        
+        print(f"\n💬 CONVERSATION TURNS:")
+        print(f"   {'conversation':22s} {'turn':>4s} {'prompt':>7s} {'prefill':>8s} {'reused':>7s} {'ttft':>8s} {'saved':>8s}")
+        for stats in self.turn_stats:
+            saved = f"{stats['ttft_saved'] * 1000:6.0f}ms" if "ttft_saved" in stats else f"{'-':>8s}"
+            mark = "~" if stats['estimated'] else " "
+            print(f"   {stats['conversation_id'][:22]:22s} {stats['turn']:4d} "
+                  f"{stats['prompt_tokens'] if stats['prompt_tokens'] is not None else '-':>7} "
+                  f"{stats['prefill_tokens'] if stats['prefill_tokens'] is not None else '-':>8} "
+                  f"{stats['reused_tokens'] if stats['reused_tokens'] is not None else '-':>6}{mark} "
+                  f"{stats['ttft'] * 1000:6.0f}ms {saved}")
+        
+        with_usage = [t for t in self.turn_stats if t['reused_tokens'] is not None]
+        if with_usage:
+            prompt = sum(t['prompt_tokens'] for t in with_usage)
+            reused = sum(t['reused_tokens'] for t in with_usage)
+            print(f"\n   Prefill tokens reused: {reused}/{prompt} ({reused / prompt:.1%})"
+                  f"{' (~ estimated from shared prefixes)' if any(t['estimated'] for t in with_usage) else ''}")
+        
+        cold = [t for t in self.turn_stats if "ttft_saved" in t]
+        if cold:
+            print(f"   Mean ttft: {statistics.mean(t['ttft'] for t in cold) * 1000:.0f}ms warm vs "
+                  f"{statistics.mean(t['cold_ttft'] for t in cold) * 1000:.0f}ms cold "
+                  f"(saved {statistics.mean(t['ttft_saved'] for t in cold) * 1000:.0f}ms per turn)")
+        
+        context_dependent = [r for r in results if r.category == "context_dependent"]
+        if context_dependent:
+            correct = sum(1 for r in context_dependent if r.correct)
+            print(f"   Context-dependent accuracy: {correct / len(context_dependent):.1%} ({correct}/{len(context_dependent)})")
+    
     def calculate_metrics(self, results: List[EvalResult] = None) -> Dict:
         """Calculate comprehensive evaluation metrics"""
         if results is None:
@@ -395,6 +1352,65 @@ class IntentEvaluator:
             }
         }
     
+    def calculate_weighted_metrics(self, results: List[EvalResult] = None,
+                                   stratum_sizes: Optional[Dict[Tuple[str, str], int]] = None,
+                                   stratum_samples: Optional[Dict[Tuple[str, str], int]] = None) -> Dict:
+        """Estimate full-corpus metrics from a weighted subsample (Horvitz-Thompson)
+        
+        Each stratum's totals are sums of w*y over its evaluated cases. When an
+        adaptive run stops early, only m of a stratum's n sampled cases are
+        evaluated; since the adaptive order is a random subsample within each
+        stratum, scaling the weights by n/m keeps the totals unbiased. Strata
+        without any evaluated case are reported as unestimated and left out.
+        """
+        if results is None:
+            results = self.results
+        if stratum_sizes is None:
+            stratum_sizes = self.stratum_sizes
+        if stratum_samples is None:
+            stratum_samples = self.stratum_samples
+        
+        if not results:
+            return {}
+        
+        strata = defaultdict(list)
+        for r in results:
+            strata[(r.category, r.difficulty)].append(r)
+        if not stratum_sizes:
+            # No sampling frame: the weights themselves estimate each stratum's size
+            stratum_sizes = {h: sum(r.weight for r in rs) for h, rs in strata.items()}
+        
+        covered = sum(stratum_sizes[h] for h in strata)
+        tp = fp = fn = correct = variance = 0.0
+        for h, rs in strata.items():
+            scale = stratum_samples.get(h, len(rs)) / len(rs)
+            
+            def total(predicate) -> float:
+                return scale * sum(r.weight for r in rs if predicate(r))
+            
+            correct += total(lambda r: r.correct)
+            tp += total(lambda r: r.expected == "action" and r.predicted == "action")
+            fp += total(lambda r: r.expected == "chat" and r.predicted == "action")
+            fn += total(lambda r: r.expected == "action" and r.predicted == "chat")
+            # With-replacement variance approximation of the stratum total
+            if len(rs) > 1:
+                variance += statistics.variance([scale * len(rs) * r.weight * r.correct for r in rs]) / len(rs)
+        
+        precision = tp / (tp + fp) if (tp + fp) > 0 else 0
+        recall = tp / (tp + fn) if (tp + fn) > 0 else 0
+        return {
+            "accuracy": correct / covered,
+            "accuracy_stderr": math.sqrt(variance) / covered,
+            "precision": precision,
+            "recall": recall,
+            "f1_score": 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0,
+            "population_size": sum(stratum_sizes.values()),
+            "covered_size": covered,
+            "sample_size": len(results),
+            "unestimated_strata": sorted(f"{category}/{difficulty}" for category, difficulty in stratum_sizes
+                                         if (category, difficulty) not in strata),
+        }
+    
     def analyze_by_category(self, results: List[EvalResult] = None) -> Dict:
         """Analyze results by test case category"""
         if results is None:
@@ -485,6 +1501,10 @@ class IntentEvaluator:
         print(f"\n📊 COMPREHENSIVE EVALUATION REPORT")
         print("=" * 50)
         
+        if not metrics:
+            print("⚠️  No test cases were evaluated")
+            return
+        
         # Overall metrics
         print(f"\n🎯 OVERALL PERFORMANCE:")
         print(f"   Accuracy: {metrics['accuracy']:.1%} ({metrics['correct']}/{metrics['total_cases']})")
@@ -519,8 +1539,90 @@ class IntentEvaluator:
             if difficulty in difficulty_analysis:
                 stats = difficulty_analysis[difficulty]
                 print(f"   {difficulty.capitalize():8s}: {stats['accuracy']:5.1%} ({stats['correct']:2d}/{stats['total']:2d})")
+        
+        if self.sampling_summary and results is self.results:
+            weighted = self.calculate_weighted_metrics(results)
+            print(f"\n🧮 ESTIMATED FULL-CORPUS PERFORMANCE ({weighted['sample_size']}/{weighted['population_size']} cases sampled):")
+            print(f"   Accuracy: {weighted['accuracy']:.1%} (± {weighted['accuracy_stderr']:.1%} std err)")
+            print(f"   Precision: {weighted['precision']:.1%}")
+            print(f"   Recall: {weighted['recall']:.1%}")
+            print(f"   F1 Score: {weighted['f1_score']:.3f}")
+            if weighted['unestimated_strata']:
+                print(f"   ⚠️  Unestimated strata (no evaluated cases, {weighted['population_size'] - weighted['covered_size']} "
+                      f"corpus cases excluded): {', '.join(weighted['unestimated_strata'])}")
+        
+        if self.adaptive_summary and results is self.results:
+            self.print_adaptive_summary(self.adaptive_summary)
+        
+        if self.call_stats and results is self.results:
+            self.print_request_stats()
+    
+    def print_request_stats(self) -> None:
+        """Print timeouts, retries, engine restarts and dropped cases"""
+        stats = self.call_stats
+        print(f"\n🛡️  REQUEST HEALTH:")
+        print(f"   Model calls: {stats['calls']} (timeouts {stats['timeouts']}, errors {stats['errors']}, "
+              f"retries {stats['retries']}, engine restarts {stats['restarts']})")
+        print(f"   Dropped cases: {stats['dropped']} (scored as errors)")
+        for drop in self.dropped[:10]:
+            print(f"      \"{drop['query']}\" → {drop['reason']}")
+        if len(self.dropped) > 10:
+            print(f"      ... and {len(self.dropped) - 10} more")
+    
+    def print_adaptive_summary(self, summary: Dict) -> None:
+        """Print confidence bounds and model calls saved by adaptive stopping"""
+        acc_lo, acc_hi = summary['accuracy_ci']
+        f1_lo, f1_hi = summary['f1_ci']
+        print(f"\n⏱️  ADAPTIVE STOPPING:")
+        print(f"   Accuracy: {summary['accuracy']:.1%} [{acc_lo:.1%}, {acc_hi:.1%}]")
+        print(f"   F1 Score: {summary['f1']:.3f} [{f1_lo:.3f}, {f1_hi:.3f}]")
+        if "paired" in summary:
+            paired = summary['paired']
+            delta_lo, delta_hi = paired['delta_ci']
+            print(f"   Vs baseline: {paired['accuracy_delta']:+.1%} [{delta_lo:+.1%}, {delta_hi:+.1%}] over {paired['pairs']} paired queries")
+        if summary['stop']:
+            print(f"   Stopped early: {summary['reason']}")
+        else:
+            print(f"   Target not reached before the dataset ran out")
+        print(f"   Intervals at {summary['confidence_level']:.2%} confidence (alpha spent over {summary['looks']} checks)")
+        saved = summary['calls_saved']
+        share = f", {saved / summary['total_cases']:.1%}" if summary['total_cases'] else ""
+        print(f"   Model calls: {summary['model_calls']}/{summary['total_cases']} (saved {saved}{share})")
+    
+    def started_timestamp(self) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at))
+    
+    def build_export(self, results: List[EvalResult] = None, params: Optional[Dict] = None) -> Dict:
+        """Run metadata, metrics and per-case results as exported to JSON"""
+        if results is None:
+            results = self.results
+        
+        export_data = {
+            "metadata": {
+                "run_id": self.run_id,
+                "total_cases": len(results),
+                "model": MODEL,
+                "prompt_hash": self.prompt_hash,
+                "timestamp": self.started_timestamp(),
+                "params": params or {}
+            },
+            "metrics": self.calculate_metrics(results),
+            "results": [asdict(r) for r in results]
+        }
+        if self.multi_query_summary and results is self.results:
+            export_data["multi_query"] = self.multi_query_summary
+        if self.turn_stats and results is self.results:
+            export_data["turn_stats"] = self.turn_stats
+        if self.sampling_summary and results is self.results:
+            export_data["weighted_metrics"] = self.calculate_weighted_metrics(results)
+        if self.adaptive_summary and results is self.results:
+            export_data["adaptive"] = self.adaptive_summary
+        if self.call_stats and results is self.results:
+            export_data["request_stats"] = dict(self.call_stats)
+            export_data["dropped"] = self.dropped
+        return export_data
     
-    def export_results(self, filename: str, results: List[EvalResult] = None) -> None:
+    def export_results(self, filename: str, results: List[EvalResult] = None, params: Optional[Dict] = None) -> None:
         """Export results to JSON or CSV file"""
         if results is None:
             results = self.results
@@ -529,27 +1631,21 @@ class IntentEvaluator:
         
         if filepath.suffix.lower() == '.json':
             # Export to JSON
-            export_data = {
-                "metadata": {
-                    "total_cases": len(results),
-                    "model": MODEL,
-                    "timestamp": str(Path(__file__).stat().st_mtime)
-                },
-                "metrics": self.calculate_metrics(results),
-                "results": [asdict(r) for r in results]
-            }
+            export_data = self.build_export(results, params)
             
             with open(filepath, 'w') as f:
                 json.dump(export_data, f, indent=2)
             print(f"📄 Results exported to {filepath}")
             
         elif filepath.suffix.lower() == '.csv':
-            # Export to CSV
+            # Export to CSV, repeating the run metadata on every row
+            run = [self.run_id, self.started_timestamp(), MODEL, self.prompt_hash, (params or {}).get('temp')]
             with open(filepath, 'w', newline='') as f:
                 writer = csv.writer(f)
-                writer.writerow(['query', 'expected', 'predicted', 'confidence', 'correct', 'category', 'difficulty', 'reasoning', 'notes'])
+                writer.writerow(['query', 'expected', 'predicted', 'confidence', 'correct', 'category', 'difficulty', 'reasoning', 'notes', 'weight',
+                                 'run_id', 'started_at', 'model', 'prompt_hash', 'temperature'])
                 for r in results:
-                    writer.writerow([r.query, r.expected, r.predicted, r.confidence, r.correct, r.category, r.difficulty, r.reasoning, r.notes])
+                    writer.writerow([r.query, r.expected, r.predicted, r.confidence, r.correct, r.category, r.difficulty, r.reasoning, r.notes, r.weight] + run)
             print(f"📄 Results exported to {filepath}")
         else:
             print(f"❌ Unsupported file format: {filepath.suffix}")
@@ -562,26 +1658,122 @@ def main():
     parser.add_argument('--analyze-failures', action='store_true', help='Show detailed failure analysis')
     parser.add_argument('--export-results', help='Export results to file (.json or .csv)')
     parser.add_argument('--quiet', action='store_true', help='Reduce output verbosity')
+    parser.add_argument('--adaptive', action='store_true', help='Stop early once metric confidence intervals are tight enough')
+    parser.add_argument('--ci-width', type=float, default=0.1, help='Target confidence interval width for --adaptive')
+    parser.add_argument('--confidence-level', type=float, default=0.95, help='Confidence level for --adaptive intervals')
+    parser.add_argument('--baseline-results', help='Exported JSON run to compare against in --adaptive mode')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for --adaptive case order and --sample-budget')
+    parser.add_argument('--cases', help='Load test cases from a file (.jsonl, .json or .csv) instead of the built-in set')
+    parser.add_argument('--sample-budget', type=int, help='Evaluate a stratified subsample of this many cases')
+    parser.add_argument('--hard-boost', type=float, default=2.0, help='Oversampling weight for hard/unstable queries')
+    parser.add_argument('--history', nargs='+', help='Exported JSON runs used to find hard/unstable queries')
+    parser.add_argument('--conversations', nargs='?', const='builtin', help='Evaluate multi-turn conversations (built-in set, or a JSONL file)')
+    parser.add_argument('--cold-baseline', action='store_true', help='Also send each conversation turn without prefix reuse to measure the latency saved')
+    parser.add_argument('--multi-query', type=int, nargs='+', metavar='K', help='Sweep packing K queries into one prompt (e.g. 1 4 8 16)')
+    parser.add_argument('--trace-events', help='Write a Chrome trace-event timeline (open in Perfetto) to this file')
+    parser.add_argument('--engine-profile', help='Engine profile JSON (mode and EngineConfig) from autotune_engine.py')
+    parser.add_argument('--server-url', help='Use a running OpenAI-compatible server (e.g. mlc_llm serve) instead of loading the model')
+    parser.add_argument('--request-timeout', type=float, default=60.0, help='Seconds before a model call is cancelled (0 disables)')
+    parser.add_argument('--max-retries', type=int, default=2, help='Retries for failed or timed-out model calls')
+    parser.add_argument('--retry-backoff', type=float, default=0.5, help='Seconds before the first retry (doubles each retry)')
+    parser.add_argument('--warehouse', help='Also record the run in this SQLite results warehouse (see results_warehouse.py)')
     
     args = parser.parse_args()
     
-    if not any([args.full_eval, args.dataset, args.analyze_failures]):
+    if not any([args.full_eval, args.dataset, args.analyze_failures, args.conversations, args.multi_query]):
         parser.print_help()
         print(f"\nExamples:")
         print(f"  python mlc_llm/eval_intent_detection.py --full-eval")
         print(f"  python mlc_llm/eval_intent_detection.py --dataset ambiguous --temp 0.2")
         print(f"  python mlc_llm/eval_intent_detection.py --full-eval --export-results results.json")
+        print(f"  python mlc_llm/eval_intent_detection.py --full-eval --adaptive --baseline-results results.json")
+        print(f"  python mlc_llm/eval_intent_detection.py --full-eval --cases corpus.jsonl --sample-budget 500")
+        print(f"  python mlc_llm/eval_intent_detection.py --conversations --cold-baseline")
+        print(f"  python mlc_llm/eval_intent_detection.py --multi-query 1 4 8 16")
         return
     
-    evaluator = IntentEvaluator()
+    tracer = make_tracer(args.trace_events)
+    profile = load_engine_profile(args.engine_profile) if args.engine_profile else None
+    policy = RequestPolicy(
+        timeout=args.request_timeout or None,
+        max_retries=args.max_retries,
+        backoff=args.retry_backoff
+    )
+    if profile and args.server_url:
+        print("⚠️  --engine-profile is ignored with --server-url (configure the server instead)")
+    evaluator = IntentEvaluator(tracer, profile, policy, args.server_url)
+    # Options that shape the run's results, recorded with every export
+    params = {k: v for k, v in vars(args).items()
+              if k not in ('export_results', 'trace_events', 'warehouse', 'quiet', 'analyze_failures')}
     
     try:
-        if args.full_eval or args.dataset:
+        if args.conversations:
+            conversations = CONVERSATION_TEST_CASES if args.conversations == 'builtin' else load_conversations(args.conversations)
+            results = evaluator.run_conversation_evaluation(
+                conversations,
+                temperature=args.temp,
+                verbose=not args.quiet,
+                cold_baseline=args.cold_baseline
+            )
+            
+            evaluator.print_comprehensive_report(results)
+            evaluator.print_conversation_report(results)
+            
+            if args.analyze_failures:
+                evaluator.analyze_failures(results)
+            
+            if args.export_results:
+                evaluator.export_results(args.export_results, results, params)
+            
+            if args.warehouse:
+                ingest_export(args.warehouse, evaluator.build_export(results, params))
+            
+            if args.trace_events:
+                tracer.save(args.trace_events)
+        
+        elif args.multi_query:
+            results = evaluator.run_multi_query_evaluation(
+                args.multi_query,
+                temperature=args.temp,
+                dataset_filter=args.dataset,
+                verbose=not args.quiet,
+                test_cases=load_test_cases(args.cases) if args.cases else None
+            )
+            
+            evaluator.print_comprehensive_report(results)
+            evaluator.print_multi_query_report()
+            
+            if args.analyze_failures:
+                evaluator.analyze_failures(results)
+            
+            if args.export_results:
+                evaluator.export_results(args.export_results, results, params)
+            
+            if args.warehouse:
+                ingest_export(args.warehouse, evaluator.build_export(results, params))
+            
+            if args.trace_events:
+                tracer.save(args.trace_events)
+        
+        elif args.full_eval or args.dataset:
             # Run evaluation
             results = evaluator.run_full_evaluation(
                 temperature=args.temp,
                 dataset_filter=args.dataset,
-                verbose=not args.quiet
+                verbose=not args.quiet,
+                adaptive=AdaptiveConfig(
+                    ci_width=args.ci_width,
+                    confidence_level=args.confidence_level,
+                    baseline_results=args.baseline_results,
+                    seed=args.seed
+                ) if args.adaptive else None,
+                test_cases=load_test_cases(args.cases) if args.cases else None,
+                sampling=SamplingConfig(
+                    budget=args.sample_budget,
+                    hard_boost=args.hard_boost,
+                    history=args.history,
+                    seed=args.seed
+                ) if args.sample_budget else None
             )
             
             # Print comprehensive report
@@ -591,7 +1783,13 @@ def main():
                 evaluator.analyze_failures(results)
                 
             if args.export_results:
-                evaluator.export_results(args.export_results, results)
+                evaluator.export_results(args.export_results, results, params)
+            
+            if args.warehouse:
+                ingest_export(args.warehouse, evaluator.build_export(results, params))
+            
+            if args.trace_events:
+                tracer.save(args.trace_events)
         
         elif args.analyze_failures:
             print("❌ No results to analyze. Run --full-eval first.")
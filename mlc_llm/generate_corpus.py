@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Synthetic Test-Corpus Generator
+
+Expands the hand-written test cases into large labeled corpora for stress and
+throughput benchmarks. Each row is a seed case with one or more label-preserving
+variants applied: typos, casing, politeness, topic swaps and length padding,
+in the spirit of the existing edge cases ("seach for AI", "FIND AI DISCUSSIONS").
+A configurable share of rows are near or exact duplicates of earlier rows, so
+caching and dedup features see realistic repetition.
+
+Rows stream out as JSONL in the TestCase format (plus `variants` and
+`duplicate_of`), so they load directly with `eval_intent_detection.py --cases`.
+The same seed always produces the same corpus.
+
+Usage:
+    python mlc_llm/generate_corpus.py --rows 10000 --output corpus.jsonl
+    python mlc_llm/generate_corpus.py --rows 10000000 --dup-rate 0.3 --output big.jsonl
+    python mlc_llm/generate_corpus.py --rows 1000 --seed 7 | head
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from dataclasses import asdict
+from typing import Dict, Iterator, List
+
+from eval_intent_detection import COMPREHENSIVE_TEST_CASES, TestCase, load_test_cases
+
+TOPICS = [
+    "AI", "React", "startups", "JavaScript", "machine learning", "blockchain", "cryptocurrency",
+    "Python", "remote work", "web3", "crypto", "ML", "tech layoffs", "Rust", "Kubernetes",
+    "TypeScript", "open source", "LLMs", "databases", "climate tech", "quantum computing",
+    "SaaS pricing", "product management", "Go", "GraphQL", "self-hosting", "indie hacking",
+]
+TOPIC_RE = re.compile(r"\b(" + "|".join(sorted(map(re.escape, TOPICS), key=len, reverse=True)) + r")\b", re.IGNORECASE)
+
+POLITE_PREFIXES = ["please ", "hey, ", "hi! ", "ok so ", "yo, ", "hello, "]
+POLITE_SUFFIXES = [" please", ", thanks", " thx", " :)", " thank you"]
+LENGTH_PREFIXES = ["quick question: ", "so I was wondering, ", "sorry if this is obvious but ", "one more thing: "]
+# Padding must fit both labels: qualifiers like "if there are any" turn chat into search
+LENGTH_SUFFIXES = [" for a project I'm working on", " - asking for my team", " (just curious)", " for a side project"]
+
+KEYBOARD_NEIGHBORS = {
+    "a": "qs", "b": "vn", "c": "xv", "d": "sf", "e": "wr", "f": "dg", "g": "fh", "h": "gj", "i": "uo",
+    "j": "hk", "k": "jl", "l": "k", "m": "n", "n": "bm", "o": "ip", "p": "o", "q": "w", "r": "et",
+    "s": "ad", "t": "ry", "u": "yi", "v": "cb", "w": "qe", "x": "zc", "y": "tu", "z": "x",
+}
+
+DIFFICULTY_ORDER = ["easy", "medium", "hard"]
+
+def typo(query: str, rng: random.Random) -> str:
+    """Swap, drop, double or fat-finger one character of a word"""
+    words = query.split(" ")
+    candidates = [i for i, w in enumerate(words) if len(w) >= 3 and w.isalpha()]
+    if not candidates:
+        return query
+    i = rng.choice(candidates)
+    word = words[i]
+    pos = rng.randrange(1, len(word) - 1)
+    op = rng.randrange(4)
+    if op == 0:
+        word = word[:pos] + word[pos + 1] + word[pos] + word[pos + 2:]
+    elif op == 1:
+        word = word[:pos] + word[pos + 1:]
+    elif op == 2:
+        word = word[:pos] + word[pos] + word[pos:]
+    else:
+        neighbors = KEYBOARD_NEIGHBORS.get(word[pos].lower(), word[pos])
+        word = word[:pos] + rng.choice(neighbors) + word[pos + 1:]
+    words[i] = word
+    return " ".join(words)
+
+def casing(query: str, rng: random.Random) -> str:
+    style = rng.randrange(4)
+    if style == 0:
+        return query.upper()
+    if style == 1:
+        return query.lower()
+    if style == 2:
+        return query.title()
+    return query[:1].upper() + query[1:]
+
+def politeness(query: str, rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return rng.choice(POLITE_PREFIXES) + query
+    return query.rstrip("?") + rng.choice(POLITE_SUFFIXES)
+
+def topic_swap(query: str, rng: random.Random) -> str:
+    return TOPIC_RE.sub(lambda match: rng.choice(TOPICS), query, count=1)
+
+def length(query: str, rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return rng.choice(LENGTH_PREFIXES) + query
+    return query.rstrip("?") + rng.choice(LENGTH_SUFFIXES)
+
+VARIANTS = {
+    "typo": typo,
+    "casing": casing,
+    "politeness": politeness,
+    "topic_swap": topic_swap,
+    "length": length,
+}
+
+# Edits that keep a near-duplicate recognizably the same query
+LIGHT_EDITS = {
+    "casing": casing,
+    "whitespace": lambda query, rng: query.replace(" ", "  ", 1) if " " in query else query + " ",
+    "punctuation": lambda query, rng: query.rstrip("?!.") if query[-1:] in "?!." else query + "?",
+}
+
+def harder(difficulty: str) -> str:
+    """One step up the difficulty scale (typos make a case harder)"""
+    if difficulty not in DIFFICULTY_ORDER:
+        return difficulty
+    return DIFFICULTY_ORDER[min(DIFFICULTY_ORDER.index(difficulty) + 1, len(DIFFICULTY_ORDER) - 1)]
+
+def generate_rows(seeds: List[TestCase], rows: int, seed: int = 0, dup_rate: float = 0.1,
+                  exact_dup_rate: float = 0.0, max_variants: int = 2,
+                  reservoir_size: int = 10000) -> Iterator[Dict]:
+    """Yield labeled rows, reproducibly for a given seed
+
+    With probability dup_rate a row is a light edit of an earlier row, and with
+    exact_dup_rate an exact copy; earlier rows are drawn uniformly from a
+    bounded reservoir so memory stays flat for any corpus size.
+    """
+    rng = random.Random(seed)
+    # Empty and punctuation-only seeds have nothing for the variants to work on
+    usable = [tc for tc in seeds if re.search(r"\w", tc.query)]
+    names = list(VARIANTS)
+    reservoir: List[Dict] = []
+
+    for index in range(rows):
+        roll = rng.random()
+        if reservoir and roll < exact_dup_rate + dup_rate:
+            original = rng.choice(reservoir)
+            row = dict(original, duplicate_of=original["id"])
+            if roll >= exact_dup_rate:
+                edit = rng.choice(list(LIGHT_EDITS))
+                row["query"] = LIGHT_EDITS[edit](original["query"], rng)
+                row["variants"] = original["variants"] + [edit]
+        else:
+            base = rng.choice(usable)
+            query = base.query
+            applied = []
+            for name in rng.sample(names, rng.randint(1, max_variants)):
+                varied = VARIANTS[name](query, rng)
+                # Not every variant applies (no topic to swap, no word to misspell)
+                if varied != query:
+                    query = varied
+                    applied.append(name)
+            row = asdict(base)
+            row.update(
+                query=query,
+                difficulty=harder(base.difficulty) if "typo" in applied else base.difficulty,
+                variants=applied,
+                source=base.query,
+                duplicate_of=None,
+            )
+        row["id"] = index
+
+        # Reservoir sampling keeps a uniform sample of everything emitted so far
+        if len(reservoir) < reservoir_size:
+            reservoir.append(row)
+        else:
+            slot = rng.randrange(index + 1)
+            if slot < reservoir_size:
+                reservoir[slot] = row
+        yield row
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a large synthetic intent test corpus (JSONL)')
+    parser.add_argument('--rows', type=int, required=True, help='Number of rows to generate')
+    parser.add_argument('--output', help='Output JSONL file (default: stdout)')
+    parser.add_argument('--cases', help='Seed test cases file (default: built-in test cases)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--dup-rate', type=float, default=0.1, help='Share of rows that are near-duplicates of earlier rows')
+    parser.add_argument('--exact-dup-rate', type=float, default=0.0, help='Share of rows that are exact duplicates of earlier rows')
+    parser.add_argument('--max-variants', type=int, default=2, help='Maximum variants applied to one row')
+
+    args = parser.parse_args()
+
+    if args.dup_rate + args.exact_dup_rate > 1:
+        print("❌ --dup-rate and --exact-dup-rate must add up to at most 1")
+        return 1
+
+    seeds = load_test_cases(args.cases) if args.cases else COMPREHENSIVE_TEST_CASES
+    out = open(args.output, 'w', buffering=1 << 20) if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        for row in generate_rows(seeds, args.rows, args.seed, args.dup_rate, args.exact_dup_rate, args.max_variants):
+            out.write(json.dumps(row) + "\n")
+            if args.output and (row["id"] + 1) % 1_000_000 == 0:
+                print(f"   {row['id'] + 1:,} rows ({(row['id'] + 1) / (time.perf_counter() - start):,.0f} rows/s)")
+    except KeyboardInterrupt:
+        print("\n👋 Interrupted by user", file=sys.stderr)
+    except BrokenPipeError:
+        # Output piped into head or similar
+        return 0
+    finally:
+        if args.output:
+            out.close()
+
+    if args.output:
+        print(f"📄 Wrote {args.rows:,} rows to {args.output} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
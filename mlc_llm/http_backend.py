@@ -0,0 +1,201 @@
+"""
+OpenAI-compatible HTTP Backend
+
+A drop-in stand-in for MLCEngine that talks to a running OpenAI-compatible
+server (`mlc_llm serve`, or stub_openai_server.py for tests) instead of
+loading the model in-process:
+
+    engine = HTTPEngine("http://127.0.0.1:8000")
+    response = engine.chat.completions.create(messages=[...], stream=False)
+    response.choices[0].message.content
+
+Only the parts of the engine interface the test scripts use are covered:
+chat.completions.create (streaming and not, with usage) and terminate().
+Keep-alive connections are pooled, so concurrent requests each get their own
+connection and sequential requests skip the TCP handshake. The socket timeout
+bounds every blocking read, so callers with a per-request deadline should pass
+it as `timeout`; a stalled server then fails the read instead of hanging the
+calling thread. Uses only the standard library.
+"""
+
+import http.client
+import json
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+class Record(dict):
+    """JSON object with attribute access, mirroring the engine's response objects
+
+    Missing fields read as None (servers omit empty ones, e.g. `content` in a
+    role-only delta); nested objects stay dicts, so `usage.extra.get(...)` works.
+    """
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return wrap(self.get(name))
+
+def wrap(value):
+    if isinstance(value, dict) and not isinstance(value, Record):
+        return Record(value)
+    if isinstance(value, list):
+        return [wrap(item) for item in value]
+    return value
+
+class HTTPBackendError(RuntimeError):
+    pass
+
+DEFAULT_TIMEOUT = 300.0
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one server, reused across threads"""
+
+    def __init__(self, base_url: str, size: int = 16, timeout: float = DEFAULT_TIMEOUT):
+        parts = urlsplit(base_url if "://" in base_url else f"http://{base_url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.prefix = parts.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self.idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+
+    def acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            return cls(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        """Return a connection whose response has been fully read"""
+        if self.idle.qsize() < self.size:
+            self.idle.put(conn)
+        else:
+            conn.close()
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None):
+        """Send a request, returning (connection, response) with the body unread
+
+        A pooled connection the server has since closed fails on first use, so
+        that case is retried once on a fresh connection.
+        """
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        for attempt in range(2):
+            conn = self.acquire()
+            try:
+                conn.request(method, self.prefix + path, body=payload, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            if response.status >= 400:
+                try:
+                    detail = response.read().decode("utf-8", "replace")
+                except Exception:
+                    conn.close()
+                    raise
+                self.release(conn)
+                raise HTTPBackendError(f"HTTP {response.status} from {path}: {detail[:200]}")
+            return conn, response
+
+    def read_json(self, conn: http.client.HTTPConnection, response: http.client.HTTPResponse):
+        """Read and decode a whole response body, then release its connection
+
+        A failed read or decode leaves the connection in an unknown state, so
+        it is closed instead of going back to the pool.
+        """
+        try:
+            data = json.loads(response.read())
+        except Exception:
+            conn.close()
+            raise
+        self.release(conn)
+        return data
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class _Completions:
+    def __init__(self, engine: "HTTPEngine"):
+        self.engine = engine
+
+    def create(self, messages: List[Dict], stream: bool = False, **kwargs):
+        body = dict(kwargs, messages=messages, stream=stream)
+        model = self.engine.model_id()
+        if model:
+            body["model"] = model
+        conn, response = self.engine.pool.request("POST", "/v1/chat/completions", body)
+        if not stream:
+            return wrap(self.engine.pool.read_json(conn, response))
+        return self.engine.stream_events(conn, response)
+
+class _Chat:
+    def __init__(self, engine: "HTTPEngine"):
+        self.completions = _Completions(engine)
+
+class HTTPEngine:
+    def __init__(self, base_url: str, model: Optional[str] = None, pool_size: int = 16,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.base_url = base_url
+        self.pool = ConnectionPool(base_url, pool_size, timeout)
+        self.model = model
+        self.model_lock = threading.Lock()
+        self.chat = _Chat(self)
+
+    def model_id(self) -> Optional[str]:
+        """The requested model, else the first one the server lists"""
+        if self.model is None:
+            with self.model_lock:
+                if self.model is None:
+                    try:
+                        conn, response = self.pool.request("GET", "/v1/models")
+                        models = self.pool.read_json(conn, response).get("data", [])
+                    except (HTTPBackendError, ValueError):
+                        models = []
+                    # An empty id means "let the server pick"
+                    self.model = models[0]["id"] if models else ""
+        return self.model
+
+    def stream_events(self, conn: http.client.HTTPConnection,
+                      response: http.client.HTTPResponse) -> Iterator[Record]:
+        """Yield chunks from a server-sent event stream
+
+        Abandoning the generator early closes its connection, which is how the
+        server learns the request was cancelled.
+        """
+        finished = False
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                yield wrap(json.loads(data))
+            # Drain the terminating chunk so the connection can be reused
+            response.read()
+            finished = True
+        finally:
+            if finished:
+                self.pool.release(conn)
+            else:
+                conn.close()
+
+    def terminate(self) -> None:
+        self.pool.close()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Open-loop Load Testing for Intent Detection
+
+Replays queries from the evaluation dataset against the model at a target
+arrival rate, independently of how fast the engine answers. Each offered load
+level records queueing delay, time to first token and end-to-end latency, and
+the sweep produces a latency-vs-offered-load curve that shows where the
+engine saturates.
+
+Usage:
+    python mlc_llm/load_test.py --rates 0.5 1 2 4
+    python mlc_llm/load_test.py --rates 1 2 --arrival uniform --duration 30
+    python mlc_llm/load_test.py --trace arrivals.csv --speedups 1 2 4
+    python mlc_llm/load_test.py --rates 1 2 4 8 --export-results load.json
+"""
+
+import argparse
+import csv
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from eval_intent_detection import COMPREHENSIVE_TEST_CASES, MODEL, IntentEvaluator, RequestPolicy, TestCase
+from engine_profile import load_engine_profile
+from trace_events import make_tracer
+
+@dataclass
+class RequestRecord:
+    query: str
+    category: str
+    difficulty: str
+    scheduled: float  # arrival time, seconds since the start of the level
+    started: float = 0.0  # when a worker dispatched the request to the engine
+    first_token: float = 0.0
+    finished: float = 0.0
+    ok: bool = False
+    error: str = ""
+
+    @property
+    def queue_delay(self) -> float:
+        return self.started - self.scheduled
+
+    @property
+    def ttft(self) -> float:
+        """Time to first token, measured from arrival"""
+        return self.first_token - self.scheduled
+
+    @property
+    def e2e(self) -> float:
+        return self.finished - self.scheduled
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentile with linear interpolation between closest ranks"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def poisson_arrivals(rate: float, duration: float, rng: random.Random) -> List[float]:
+    """Arrival offsets of a Poisson process with the given rate (req/s)"""
+    arrivals = []
+    t = rng.expovariate(rate)
+    while t < duration:
+        arrivals.append(t)
+        t += rng.expovariate(rate)
+    return arrivals
+
+def uniform_arrivals(rate: float, duration: float) -> List[float]:
+    """Evenly spaced arrival offsets at the given rate (req/s)"""
+    return [i / rate for i in range(int(duration * rate))]
+
+def load_trace(path: str) -> List[Tuple[float, Optional[str]]]:
+    """Load arrival times from a CSV or JSONL trace
+
+    Each row needs a `timestamp` in seconds (absolute or relative) and may
+    carry the `query` that arrived. Offsets are normalized to start at zero.
+    """
+    filepath = Path(path)
+    rows = []
+    with open(filepath, newline='') as f:
+        if filepath.suffix.lower() == '.csv':
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    if not rows:
+        raise ValueError(f"Trace {filepath} has no arrivals")
+
+    arrivals = sorted((float(row['timestamp']), row.get('query')) for row in rows)
+    origin = arrivals[0][0]
+    return [(ts - origin, query) for ts, query in arrivals]
+
+class LoadTester:
+    def __init__(self, evaluator: IntentEvaluator, temperature: float = 0.1,
+                 concurrency: int = 32, window: float = 10.0):
+        self.evaluator = evaluator
+        self.temperature = temperature
+        self.concurrency = concurrency
+        self.window = window
+
+    def _run_request(self, record: RequestRecord, origin: float) -> None:
+        """Send one request and fill in its timings relative to origin"""
+        tracer = self.evaluator.tracer
+        started = time.perf_counter()
+        record.started = started - origin
+        # Queued requests overlap each other, so they go on async tracks
+        tracer.async_span("queue", origin + record.scheduled, started, id(record), query=record.query)
+
+        with tracer.span("request", query=record.query, category=record.category, difficulty=record.difficulty):
+            with tracer.span("render_prompt"):
+                prompt = self.evaluator.prompt_template.replace('{message}', record.query)
+            outcome = self.evaluator.call_model_stream(prompt, self.temperature)
+            record.finished = time.perf_counter() - origin
+
+            if outcome is None:
+                record.first_token = record.finished
+                record.error = getattr(self.evaluator.local, "failure", None) or "model call failed"
+                return
+
+            content, ttft = outcome
+            record.first_token = record.started + ttft
+            with tracer.span("parse"):
+                parsed = self.evaluator.parse_response(content)
+            if "error" in parsed:
+                record.error = parsed["error"]
+            else:
+                record.ok = True
+
+    def run_level(self, arrivals: List[Tuple[float, TestCase]], offered_rate: float,
+                  verbose: bool = True) -> Dict:
+        """Fire requests at their arrival offsets without waiting for earlier ones"""
+        records = [RequestRecord(tc.query, tc.category, tc.difficulty, offset) for offset, tc in arrivals]
+        if verbose:
+            print(f"\n🚦 Offered load {offered_rate:.2f} req/s: {len(records)} requests")
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        origin = time.perf_counter()
+        for record in records:
+            delay = record.scheduled - (time.perf_counter() - origin)
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(self._run_request, record, origin)
+        executor.shutdown(wait=True)
+
+        return self.summarize(records, offered_rate)
+
+    def summarize(self, records: List[RequestRecord], offered_rate: float) -> Dict:
+        """Aggregate latencies for one offered load level"""
+        done = [r for r in records if r.ok]
+        elapsed = max((r.finished for r in records), default=0.0)
+        arrival_span = max((r.scheduled for r in records), default=0.0)
+
+        timeline = []
+        if records:
+            for start in range(0, int(arrival_span // self.window) + 1):
+                lo, hi = start * self.window, (start + 1) * self.window
+                bucket = [r for r in done if lo <= r.scheduled < hi]
+                timeline.append({
+                    "window_start": lo,
+                    "completed": len(bucket),
+                    "queue_p99": percentile([r.queue_delay for r in bucket], 99),
+                    "e2e_p50": percentile([r.e2e for r in bucket], 50),
+                    "e2e_p99": percentile([r.e2e for r in bucket], 99),
+                })
+
+        return {
+            "offered_rate": offered_rate,
+            "arrival_rate": (len(records) - 1) / arrival_span if arrival_span > 0 else 0.0,
+            "requests": len(records),
+            "completed": len(done),
+            "errors": len(records) - len(done),
+            "throughput": len(done) / elapsed if elapsed > 0 else 0.0,
+            "queue_p50": percentile([r.queue_delay for r in done], 50),
+            "queue_p99": percentile([r.queue_delay for r in done], 99),
+            "ttft_p50": percentile([r.ttft for r in done], 50),
+            "ttft_p99": percentile([r.ttft for r in done], 99),
+            "e2e_p50": percentile([r.e2e for r in done], 50),
+            "e2e_p99": percentile([r.e2e for r in done], 99),
+            "timeline": timeline,
+            "records": [dict(asdict(r), queue_delay=r.queue_delay, ttft=r.ttft, e2e=r.e2e) for r in records],
+        }
+
+    @staticmethod
+    def find_saturation(levels: List[Dict], throughput_tolerance: float = 0.1,
+                        latency_factor: float = 3.0) -> Optional[Dict]:
+        """First level where the engine stops keeping up with the offered load
+
+        A level is saturated when achieved throughput falls behind the realized
+        arrival rate by more than the tolerance, or p99 latency grows beyond
+        latency_factor times the p99 at the lightest load. Short levels inflate
+        the throughput gap with drain time, so prefer durations of a minute or
+        more when locating the knee.
+        """
+        if not levels:
+            return None
+        ordered = sorted(levels, key=lambda level: level["offered_rate"])
+        baseline_p99 = ordered[0]["e2e_p99"]
+        for level in ordered:
+            if level["throughput"] < (1 - throughput_tolerance) * level["arrival_rate"]:
+                return level
+            if baseline_p99 > 0 and level["e2e_p99"] > latency_factor * baseline_p99:
+                return level
+        return None
+
+    def print_curve(self, levels: List[Dict], show_timeline: bool = False) -> None:
+        """Print the latency-vs-offered-load curve"""
+        print(f"\n📈 LATENCY VS OFFERED LOAD")
+        print("=" * 96)
+        print(f"   {'offered':>8s} {'achieved':>9s} {'ok/total':>10s} "
+              f"{'queue p50':>10s} {'queue p99':>10s} {'ttft p50':>9s} {'ttft p99':>9s} "
+              f"{'e2e p50':>8s} {'e2e p99':>8s}")
+        for level in sorted(levels, key=lambda level: level["offered_rate"]):
+            print(f"   {level['offered_rate']:8.2f} {level['throughput']:9.2f} "
+                  f"{level['completed']:4d}/{level['requests']:<5d} "
+                  f"{level['queue_p50']:9.3f}s {level['queue_p99']:9.3f}s "
+                  f"{level['ttft_p50']:8.3f}s {level['ttft_p99']:8.3f}s "
+                  f"{level['e2e_p50']:7.3f}s {level['e2e_p99']:7.3f}s")
+
+            if show_timeline:
+                for bucket in level["timeline"]:
+                    print(f"      t={bucket['window_start']:6.0f}s  done={bucket['completed']:4d}  "
+                          f"queue p99={bucket['queue_p99']:.3f}s  "
+                          f"e2e p50={bucket['e2e_p50']:.3f}s  e2e p99={bucket['e2e_p99']:.3f}s")
+
+        saturated = self.find_saturation(levels)
+        peak = max(level["throughput"] for level in levels) if levels else 0.0
+        if saturated:
+            print(f"\n🧱 Saturation at offered load {saturated['offered_rate']:.2f} req/s "
+                  f"(peak achieved throughput {peak:.2f} req/s)")
+        else:
+            print(f"\n✅ No saturation up to {max(l['offered_rate'] for l in levels):.2f} req/s "
+                  f"(peak achieved throughput {peak:.2f} req/s)")
+
+    def export_results(self, filename: str, levels: List[Dict]) -> None:
+        """Export the load curve to JSON (full records) or CSV (one row per level)"""
+        filepath = Path(filename)
+
+        if filepath.suffix.lower() == '.json':
+            saturated = self.find_saturation(levels)
+            export_data = {
+                "metadata": {
+                    "model": MODEL,
+                    "temperature": self.temperature,
+                    "concurrency": self.concurrency,
+                    "window": self.window,
+                    "saturation_rate": saturated["offered_rate"] if saturated else None,
+                },
+                "levels": levels,
+            }
+            with open(filepath, 'w') as f:
+                json.dump(export_data, f, indent=2)
+            print(f"📄 Results exported to {filepath}")
+
+        elif filepath.suffix.lower() == '.csv':
+            columns = ['offered_rate', 'throughput', 'requests', 'completed', 'errors',
+                       'queue_p50', 'queue_p99', 'ttft_p50', 'ttft_p99', 'e2e_p50', 'e2e_p99']
+            with open(filepath, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for level in levels:
+                    writer.writerow([level[c] for c in columns])
+            print(f"📄 Results exported to {filepath}")
+        else:
+            print(f"❌ Unsupported file format: {filepath.suffix}")
+
+def build_arrivals(offsets: List[float], test_cases: List[TestCase],
+                   rng: random.Random) -> List[Tuple[float, TestCase]]:
+    """Pair arrival offsets with dataset queries, cycling through a shuffled copy"""
+    pool = list(test_cases)
+    rng.shuffle(pool)
+    return [(offset, pool[i % len(pool)]) for i, offset in enumerate(offsets)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Open-loop load test for intent detection')
+    parser.add_argument('--rates', type=float, nargs='+', help='Offered loads to sweep (requests/second)')
+    parser.add_argument('--arrival', choices=['poisson', 'uniform'], default='poisson', help='Arrival process for --rates')
+    parser.add_argument('--duration', type=float, default=60.0, help='Seconds of arrivals per load level')
+    parser.add_argument('--trace', help='Replay arrival times from a CSV/JSONL trace (timestamp[,query])')
+    parser.add_argument('--speedups', type=float, nargs='+', default=[1.0], help='Trace replay speed factors to sweep')
+    parser.add_argument('--dataset', help='Filter test cases by category (e.g., "ambiguous", "edge_case")')
+    parser.add_argument('--concurrency', type=int, default=32, help='Maximum in-flight requests')
+    parser.add_argument('--window', type=float, default=10.0, help='Timeline bucket size in seconds')
+    parser.add_argument('--temp', type=float, default=0.1, help='Temperature (0.0-1.0)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for arrivals and query order')
+    parser.add_argument('--timeline', action='store_true', help='Print per-window latency over time')
+    parser.add_argument('--export-results', help='Export load curve to file (.json or .csv)')
+    parser.add_argument('--trace-events', help='Write a Chrome trace-event timeline (open in Perfetto) to this file')
+    parser.add_argument('--server-url', help='Load-test a running OpenAI-compatible server instead of an in-process engine')
+    parser.add_argument('--request-timeout', type=float, default=60.0, help='Seconds before a request is cancelled and counted as an error (0 disables)')
+    parser.add_argument('--engine-profile', help='Engine profile JSON (mode and EngineConfig) from autotune_engine.py')
+    parser.add_argument('--quiet', action='store_true', help='Reduce output verbosity')
+
+    args = parser.parse_args()
+
+    if not args.rates and not args.trace:
+        parser.print_help()
+        print(f"\nExamples:")
+        print(f"  python mlc_llm/load_test.py --rates 0.5 1 2 4")
+        print(f"  python mlc_llm/load_test.py --trace arrivals.csv --speedups 1 2 4")
+        return
+
+    test_cases = COMPREHENSIVE_TEST_CASES
+    if args.dataset:
+        test_cases = [tc for tc in test_cases if args.dataset in tc.category]
+        if not test_cases:
+            print(f"❌ No test cases match filter: {args.dataset}")
+            return 1
+
+    tracer = make_tracer(args.trace_events)
+    profile = load_engine_profile(args.engine_profile) if args.engine_profile else None
+    # Retrying would add load the arrival process didn't offer
+    evaluator = IntentEvaluator(tracer, profile, RequestPolicy(timeout=args.request_timeout or None, max_retries=0),
+                                args.server_url)
+    if not evaluator.init_engine():
+        return 1
+    tester = LoadTester(evaluator, args.temp, args.concurrency, args.window)
+    rng = random.Random(args.seed)
+
+    # Build every level up front so a sweep is reproducible for a given seed
+    plans = []
+    if args.trace:
+        trace = load_trace(args.trace)
+        span = trace[-1][0] or 1.0
+        by_query = {tc.query: tc for tc in COMPREHENSIVE_TEST_CASES}
+        for speedup in args.speedups:
+            offsets = [offset / speedup for offset, _ in trace]
+            arrivals = build_arrivals(offsets, test_cases, rng)
+            # Keep the traced query when one was recorded
+            arrivals = [
+                (offset, (by_query.get(query) or TestCase(query, "", "trace", "")) if query else tc)
+                for (offset, tc), (_, query) in zip(arrivals, trace)
+            ]
+            plans.append(((len(trace) - 1) * speedup / span, arrivals))
+    else:
+        for rate in args.rates:
+            if args.arrival == 'poisson':
+                offsets = poisson_arrivals(rate, args.duration, rng)
+            else:
+                offsets = uniform_arrivals(rate, args.duration)
+            plans.append((rate, build_arrivals(offsets, test_cases, rng)))
+
+    levels = []
+    try:
+        for offered_rate, arrivals in plans:
+            levels.append(tester.run_level(arrivals, offered_rate, verbose=not args.quiet))
+    except KeyboardInterrupt:
+        print("\n👋 Interrupted by user")
+
+    if levels:
+        tester.print_curve(levels, show_timeline=args.timeline)
+        if args.export_results:
+            tester.export_results(args.export_results, levels)
+        if args.trace_events:
+            tracer.save(args.trace_events)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
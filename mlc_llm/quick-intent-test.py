@@ -14,8 +14,14 @@ import argparse
 import json
 import re
 import sys
+import time
 from pathlib import Path
 
+from engine_profile import describe_profile, engine_kwargs, load_engine_profile
+from http_backend import DEFAULT_TIMEOUT, HTTPEngine
+from trace_events import NULL_TRACER, make_tracer
+from weak_label import WeakLabeler
+
 MODEL = "Llama-3.2-3B-Instruct-q4f16_1-MLC"
 # MODEL = "Phi-4-mini-instruct-q4f16_1-MLC"
 
@@ -47,6 +53,8 @@ TEST_QUERIES = [
     "what is blockchain?"
 ]
 
+WEAK_LABELER = WeakLabeler()
+
 
 
 def load_prompt_from_typescript():
@@ -119,10 +127,15 @@ if PROMPT_TEMPLATE:
     print(f"🔍 PROMPT_TEMPLATE end (last 100 chars): {repr(PROMPT_TEMPLATE[-100:])}")
 
 class IntentTester:
-    def __init__(self):
+    def __init__(self, tracer=NULL_TRACER, engine_profile=None, server_url=None, request_timeout=None):
         self.engine = None
+        self.tracer = tracer
+        self.engine_profile = engine_profile
+        self.server_url = server_url
+        self.request_timeout = request_timeout
         self.model_path = None
-        self.find_model_path()
+        if not server_url:
+            self.find_model_path()
     
     def find_model_path(self):
         """Find the local model path"""
@@ -156,21 +169,28 @@ class IntentTester:
         sys.exit(1)
     
     def init_engine(self):
-        """Initialize the MLC engine"""
+        """Initialize the MLC engine (or the client for --server-url)"""
+        if self.engine is not None:
+            return True
+        
+        if self.server_url:
+            print(f"🌐 Using OpenAI-compatible server at {self.server_url}")
+            # Reads on a stalled server fail after the timeout instead of hanging
+            self.engine = HTTPEngine(self.server_url, timeout=self.request_timeout or DEFAULT_TIMEOUT)
+            return True
+        
         if not MLC_AVAILABLE:
             print("❌ MLC LLM not available")
             return False
             
-        if self.engine is None:
-            print("🚀 Initializing MLC Engine...")
-            try:
-                self.engine = MLCEngine(self.model_path)
-                print("✅ Engine initialized successfully")
-                return True
-            except Exception as e:
-                print(f"❌ Failed to initialize engine: {e}")
-                return False
-        return True
+        print(f"🚀 Initializing MLC Engine ({describe_profile(self.engine_profile)})...")
+        try:
+            self.engine = MLCEngine(self.model_path, **engine_kwargs(self.engine_profile))
+            print("✅ Engine initialized successfully")
+            return True
+        except Exception as e:
+            print(f"❌ Failed to initialize engine: {e}")
+            return False
     
     def call_model(self, prompt, temperature=0.1):
         """Call the model with the given prompt"""
@@ -181,14 +201,17 @@ class IntentTester:
         print(f"📝 Prompt preview: \"{prompt[:100]}...\"")
         
         try:
-            response = self.engine.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=200,
-                stream=False
-            )
+            if self.tracer.enabled:
+                content = self.call_model_traced(prompt, temperature)
+            else:
+                response = self.engine.chat.completions.create(
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature,
+                    max_tokens=200,
+                    stream=False
+                )
+                content = response.choices[0].message.content
             
-            content = response.choices[0].message.content
             print(f"📤 Model response length: {len(content)} chars")
             return content
             
@@ -202,6 +225,29 @@ class IntentTester:
             traceback.print_exc()
             return None
     
+    def call_model_traced(self, prompt, temperature):
+        """Stream the response so prefill and decode show up as separate spans"""
+        start = time.perf_counter()
+        first_token_at = None
+        chunks = []
+        for chunk in self.engine.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=200,
+            stream=True
+        ):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                chunks.append(delta)
+        end = time.perf_counter()
+        self.tracer.complete("prefill", start, first_token_at or end)
+        self.tracer.complete("decode", first_token_at or end, end)
+        return "".join(chunks)
+    
     def parse_response(self, response):
         """Parse JSON response from model"""
         if not response:
@@ -239,62 +285,59 @@ class IntentTester:
             return {"error": f"Parse error: {e}", "raw": response}
     
     def get_expected_result(self, query):
-        """Determine expected result based on keywords"""
-        action_keywords = ['find', 'search', 'show', 'get', 'look up', 'retrieve']
-        query_lower = query.lower()
-        
-        for keyword in action_keywords:
-            if keyword in query_lower:
-                return 'action'
-        return 'chat'
+        """Determine expected result with the weak-labeling rules"""
+        return WEAK_LABELER.label(query)[0]
     
     def test_single_query(self, query, temperature=0.1):
         """Test a single query"""
         print(f"\n🧪 Testing: \"{query}\"")
         print(f"🌡️  Temperature: {temperature}")
         
-        # Build prompt - use safe replacement function
-        prompt = build_prompt_with_message(PROMPT_TEMPLATE, query)
-        
-        # Debug: show the formatted prompt
-        print(f"🔍 Formatted prompt preview (last 100 chars):")
-        print(repr(prompt[-100:]))
-        
-        # Call model
-        response = self.call_model(prompt, temperature)
-        if not response:
-            return None
-        
-        # Parse response
-        parsed = self.parse_response(response)
-        
-        # Show results
-        print(f"\n📄 Raw response: \"{response}\"")
-        print(f"\n📊 Parsed result:")
-        
-        if "error" in parsed:
-            print(f"   ❌ Parse Error: {parsed['error']}")
-            if "raw" in parsed:
-                print(f"   📄 Raw: {parsed['raw']}")
-            return None
-        
-        print(f"   Category: {parsed.get('intentCategory', 'ERROR')}")
-        print(f"   Confidence: {parsed.get('confidence', 'ERROR')}")
-        print(f"   Reasoning: {parsed.get('reasoning', 'N/A')}")
-        
-        # Check correctness
-        expected = self.get_expected_result(query)
-        correct = parsed.get('intentCategory') == expected
-        
-        print(f"   Expected: {expected} → {'✅ CORRECT' if correct else '❌ WRONG'}")
-        
-        return {
-            'query': query,
-            'parsed': parsed,
-            'expected': expected,
-            'correct': correct,
-            'raw_response': response
-        }
+        with self.tracer.span("test_case", query=query):
+            # Build prompt - use safe replacement function
+            with self.tracer.span("render_prompt"):
+                prompt = build_prompt_with_message(PROMPT_TEMPLATE, query)
+            
+            # Debug: show the formatted prompt
+            print(f"🔍 Formatted prompt preview (last 100 chars):")
+            print(repr(prompt[-100:]))
+            
+            # Call model
+            response = self.call_model(prompt, temperature)
+            if not response:
+                return None
+            
+            # Parse response
+            with self.tracer.span("parse"):
+                parsed = self.parse_response(response)
+            
+            # Show results
+            print(f"\n📄 Raw response: \"{response}\"")
+            print(f"\n📊 Parsed result:")
+            
+            if "error" in parsed:
+                print(f"   ❌ Parse Error: {parsed['error']}")
+                if "raw" in parsed:
+                    print(f"   📄 Raw: {parsed['raw']}")
+                return None
+            
+            print(f"   Category: {parsed.get('intentCategory', 'ERROR')}")
+            print(f"   Confidence: {parsed.get('confidence', 'ERROR')}")
+            print(f"   Reasoning: {parsed.get('reasoning', 'N/A')}")
+            
+            # Check correctness
+            expected = self.get_expected_result(query)
+            correct = parsed.get('intentCategory') == expected
+            
+            print(f"   Expected: {expected} → {'✅ CORRECT' if correct else '❌ WRONG'}")
+            
+            return {
+                'query': query,
+                'parsed': parsed,
+                'expected': expected,
+                'correct': correct,
+                'raw_response': response
+            }
     
     def test_batch(self, temperature=0.1):
         """Test all queries in batch"""
@@ -329,6 +372,10 @@ def main():
     parser.add_argument('query', nargs='?', help='Query to test')
     parser.add_argument('--batch', action='store_true', help='Test all queries')
     parser.add_argument('--temp', type=float, default=0.1, help='Temperature (0.0-1.0)')
+    parser.add_argument('--trace-events', help='Write a Chrome trace-event timeline (open in Perfetto) to this file')
+    parser.add_argument('--server-url', help='Use a running OpenAI-compatible server (e.g. mlc_llm serve) instead of loading the model')
+    parser.add_argument('--engine-profile', help='Engine profile JSON (mode and EngineConfig) from autotune_engine.py')
+    parser.add_argument('--request-timeout', type=float, default=60.0, help='Seconds before a --server-url request fails (0 disables)')
     
     args = parser.parse_args()
     
@@ -340,13 +387,18 @@ def main():
         print(f"  python mlc_llm/quick-intent-test.py --temp 0.3 \"search for React\"")
         return
     
-    tester = IntentTester()
+    tracer = make_tracer(args.trace_events)
+    profile = load_engine_profile(args.engine_profile) if args.engine_profile else None
+    tester = IntentTester(tracer, profile, args.server_url, args.request_timeout)
     
     try:
         if args.batch:
             tester.test_batch(args.temp)
         elif args.query:
             tester.test_single_query(args.query, args.temp)
+        
+        if args.trace_events:
+            tracer.save(args.trace_events)
             
     except KeyboardInterrupt:
         print("\n👋 Interrupted by user")
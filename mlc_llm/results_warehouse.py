@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Evaluation Results Warehouse
+
+Collects exported evaluation runs into one local SQLite database, so questions
+across many runs ("which queries flipped over the last 20 prompt revisions?",
+"how has ambiguous-case accuracy moved this month?") are single queries
+instead of loading every export by hand.
+
+Each run is keyed by its run id and stored with its start time, model, prompt
+hash, temperature and the CLI options that produced it; per-case results are
+indexed by query and category. A case is identified across runs by its query,
+expected label and category, plus its occurrence number when a corpus repeats
+the same case within a run. Ingesting the same run twice is a no-op.
+JSON exports carry the run metadata in their header and CSV exports repeat it
+in columns on every row. Exports written before runs carried an id are keyed
+by a hash of the file and dated by the file's modification time.
+
+Usage:
+    python mlc_llm/results_warehouse.py ingest results/*.json
+    python mlc_llm/results_warehouse.py runs --limit 20
+    python mlc_llm/results_warehouse.py history "search for AI"
+    python mlc_llm/results_warehouse.py flips --last 20 --by-prompt
+    python mlc_llm/results_warehouse.py trends --category ambiguous
+    python mlc_llm/eval_intent_detection.py --full-eval --warehouse results.db
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_DB = "results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    model TEXT,
+    prompt_hash TEXT,
+    temperature REAL,
+    params TEXT,
+    source TEXT,
+    total_cases INTEGER,
+    accuracy REAL,
+    f1_score REAL,
+    metrics TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    case_index INTEGER,
+    occurrence INTEGER,
+    query TEXT NOT NULL,
+    expected TEXT,
+    predicted TEXT,
+    confidence REAL,
+    correct INTEGER,
+    category TEXT,
+    difficulty TEXT,
+    weight REAL,
+    reasoning TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_category ON results(category, run_id);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_prompt ON runs(prompt_hash, created_at);
+"""
+
+# Cases are matched across runs by this key; occurrence numbers repeats of a case within one run
+CASE_INDEX = "CREATE INDEX IF NOT EXISTS idx_results_case ON results(query, expected, category, occurrence, run_id)"
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open the warehouse, creating tables and indexes on first use"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+    with conn:
+        if "case_index" not in columns:
+            conn.execute("ALTER TABLE results ADD COLUMN case_index INTEGER")
+        if "occurrence" not in columns:
+            # Warehouses created before cases were keyed: number repeats once, in insertion order
+            conn.execute("ALTER TABLE results ADD COLUMN occurrence INTEGER")
+            conn.execute("""
+                UPDATE results SET occurrence = numbered.occurrence
+                FROM (SELECT rowid AS id, ROW_NUMBER() OVER (PARTITION BY run_id, query, expected, category
+                                                             ORDER BY case_index, rowid) AS occurrence
+                      FROM results) AS numbered
+                WHERE results.rowid = numbered.id""")
+        conn.execute(CASE_INDEX)
+        # Superseded: the case index also serves lookups by query
+        conn.execute("DROP INDEX IF EXISTS idx_results_query")
+    return conn
+
+def as_bool(value) -> int:
+    """Correctness from JSON (bool) or CSV ("True"/"False") exports"""
+    if isinstance(value, str):
+        return int(value.strip().lower() in ("true", "1", "yes"))
+    return int(bool(value))
+
+def insert_run(conn: sqlite3.Connection, run: Dict, rows: Iterable[Dict]) -> bool:
+    """Insert one run and its results in a single transaction; False if already stored"""
+    with conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, created_at, model, prompt_hash, temperature, params, source, "
+            "total_cases, accuracy, f1_score, metrics) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run["run_id"], run["created_at"], run.get("model"), run.get("prompt_hash"), run.get("temperature"),
+             json.dumps(run.get("params") or {}, sort_keys=True), run.get("source"), run.get("total_cases"),
+             run.get("accuracy"), run.get("f1_score"), json.dumps(run.get("metrics") or {})),
+        )
+        if cursor.rowcount == 0:
+            return False
+        seen = Counter()
+
+        def occurrence(r: Dict) -> int:
+            seen[(r.get("query", ""), r.get("expected"), r.get("category"))] += 1
+            return seen[(r.get("query", ""), r.get("expected"), r.get("category"))]
+
+        conn.executemany(
+            "INSERT INTO results (run_id, case_index, occurrence, query, expected, predicted, confidence, correct, "
+            "category, difficulty, weight, reasoning) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((run["run_id"], index, occurrence(r), r.get("query", ""), r.get("expected"), r.get("predicted"),
+              float(r.get("confidence") or 0.0), as_bool(r.get("correct")), r.get("category"),
+              r.get("difficulty"), float(r.get("weight") or 1.0), r.get("reasoning"))
+             for index, r in enumerate(rows)),
+        )
+    return True
+
+def run_from_export(data: Dict, source: Optional[str] = None) -> Dict:
+    """Run row from an export dict produced by IntentEvaluator.build_export"""
+    metadata = data.get("metadata", {})
+    metrics = data.get("metrics", {})
+    params = metadata.get("params", {})
+    return {
+        "run_id": metadata["run_id"],
+        "created_at": metadata["timestamp"],
+        "model": metadata.get("model"),
+        "prompt_hash": metadata.get("prompt_hash"),
+        "temperature": params.get("temp"),
+        "params": params,
+        "source": source,
+        "total_cases": metadata.get("total_cases"),
+        "accuracy": metrics.get("accuracy"),
+        "f1_score": metrics.get("f1_score"),
+        "metrics": metrics,
+    }
+
+def ingest_export(db_path: str, data: Dict, source: Optional[str] = None) -> bool:
+    """Record an in-memory export (used by eval_intent_detection.py --warehouse)"""
+    conn = connect(db_path)
+    try:
+        added = insert_run(conn, run_from_export(data, source), data.get("results", []))
+    finally:
+        conn.close()
+    if added:
+        print(f"🗄️  Run {data['metadata']['run_id'][:8]} recorded in {db_path}")
+    return added
+
+def ingest_file(conn: sqlite3.Connection, path: Path) -> Optional[bool]:
+    """Ingest one exported JSON or CSV file; None if it is not an evaluation export"""
+    raw = path.read_bytes()
+    file_time = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(path.stat().st_mtime))
+    legacy_id = hashlib.sha256(raw).hexdigest()[:32]
+
+    if path.suffix.lower() == '.csv':
+        rows = list(csv.DictReader(raw.decode('utf-8').splitlines()))
+        if not rows or "predicted" not in rows[0]:
+            return None
+        correct = sum(as_bool(r["correct"]) for r in rows)
+        run = {"run_id": legacy_id, "created_at": file_time, "source": str(path),
+               "total_cases": len(rows), "accuracy": correct / len(rows)}
+        if rows[0].get("run_id"):
+            # Newer CSV exports repeat the run metadata on every row
+            first = rows[0]
+            run.update(run_id=first["run_id"], created_at=first["started_at"], model=first.get("model") or None,
+                       prompt_hash=first.get("prompt_hash") or None,
+                       temperature=float(first["temperature"]) if first.get("temperature") else None)
+        return insert_run(conn, run, rows)
+
+    data = json.loads(raw)
+    if not isinstance(data, dict) or not isinstance(data.get("results"), list):
+        return None
+    metadata = data.setdefault("metadata", {})
+    if "run_id" not in metadata:
+        # Older exports were stamped with the script's mtime, not the run time
+        metadata["run_id"] = legacy_id
+        metadata["timestamp"] = file_time
+    return insert_run(conn, run_from_export(data, str(path)), data["results"])
+
+def select_runs_sql(last: Optional[int], by_prompt: bool, model: Optional[str]) -> Tuple[str, List]:
+    """SQL selecting the runs to compare (the most recent `last` of them)"""
+    where, args = "", []
+    if model:
+        where, args = "WHERE model = ?", [model]
+    if by_prompt:
+        # The latest run of each prompt revision
+        source = (f"SELECT run_id, created_at, prompt_hash FROM ("
+                  f"SELECT run_id, created_at, prompt_hash, ROW_NUMBER() OVER "
+                  f"(PARTITION BY prompt_hash ORDER BY created_at DESC) AS rank FROM runs {where}) WHERE rank = 1")
+    else:
+        source = f"SELECT run_id, created_at, prompt_hash FROM runs {where}"
+    if last:
+        source += " ORDER BY created_at DESC LIMIT ?"
+        args.append(last)
+    return source, args
+
+class ResultsWarehouse:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = connect(db_path)
+
+    def ingest(self, filenames: List[str]) -> None:
+        added = skipped = ignored = 0
+        started = time.perf_counter()
+        for filename in filenames:
+            outcome = ingest_file(self.conn, Path(filename))
+            if outcome is None:
+                print(f"⚠️  {filename} is not an evaluation export, skipped")
+                ignored += 1
+            elif outcome:
+                added += 1
+            else:
+                skipped += 1
+        print(f"🗄️  Ingested {added} runs ({skipped} already present, {ignored} ignored) "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    def runs(self, limit: int = 20) -> None:
+        rows = self.conn.execute(
+            "SELECT run_id, created_at, model, prompt_hash, temperature, total_cases, accuracy, f1_score "
+            "FROM runs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        print(f"\n🗂️  RUNS ({len(rows)} most recent)")
+        print("=" * 96)
+        print(f"   {'run':8s}  {'started':19s}  {'prompt':16s}  {'temp':>5s}  {'cases':>7s}  {'accuracy':>8s}  {'F1':>6s}")
+        for run_id, created_at, model, prompt_hash, temperature, total, accuracy, f1 in rows:
+            temp = f"{temperature:.2f}" if temperature is not None else "-"
+            f1_text = f"{f1:.3f}" if f1 is not None else "-"
+            print(f"   {run_id[:8]:8s}  {created_at:19s}  {prompt_hash or '-':16s}  {temp:>5s}  "
+                  f"{total or 0:7d}  {(accuracy or 0):8.1%}  {f1_text:>6s}")
+
+    def history(self, query: str, limit: int = 50) -> None:
+        """Predictions for one query across runs, one timeline per distinct case"""
+        rows = self.conn.execute(f"""
+            SELECT runs.created_at, runs.run_id, runs.prompt_hash, c.expected, c.category, c.occurrence,
+                   c.predicted, c.confidence, c.correct
+            FROM results c JOIN runs USING (run_id)
+            WHERE c.query = ?
+            ORDER BY runs.created_at DESC LIMIT ?""", (query, limit)).fetchall()
+        if not rows:
+            print(f"❌ No results for query: \"{query}\"")
+            return
+        timelines: Dict[Tuple, List] = {}
+        for row in reversed(rows):
+            timelines.setdefault(row[3:6], []).append(row)
+        for (expected, category, occurrence), timeline in sorted(timelines.items(), key=lambda item: str(item[0])):
+            repeat = f", occurrence {occurrence}" if occurrence > 1 else ""
+            print(f"\n📜 HISTORY: \"{query}\" (expected {expected}, {category or '-'}{repeat})")
+            print("=" * 80)
+            for created_at, run_id, prompt_hash, _, _, _, predicted, confidence, correct in timeline:
+                print(f"   {created_at:19s}  {run_id[:8]}  {prompt_hash or '-':16s}  "
+                      f"{'✅' if correct else '❌'} {predicted or '-':6s} ({confidence:.2f})")
+            correct = sum(row[8] for row in timeline)
+            print(f"\n   {correct}/{len(timeline)} correct, {len({row[6] for row in timeline})} distinct predictions")
+
+    def flips(self, last: Optional[int] = 20, by_prompt: bool = False, model: Optional[str] = None,
+              category: Optional[str] = None, limit: int = 50) -> None:
+        """Cases whose prediction changed between consecutive selected runs"""
+        selected, args = select_runs_sql(last, by_prompt, model)
+        category_filter = ""
+        if category:
+            category_filter = "WHERE c.category LIKE ?"
+            args.append(f"%{category}%")
+        args.append(limit)
+        rows = self.conn.execute(f"""
+            WITH selected AS ({selected}),
+            ordered AS (
+                SELECT c.query, c.expected, c.category, c.occurrence, c.predicted, s.run_id, s.created_at,
+                       LAG(c.predicted) OVER w AS previous
+                FROM results c JOIN selected s USING (run_id)
+                {category_filter}
+                WINDOW w AS (PARTITION BY c.query, c.expected, c.category, c.occurrence
+                             ORDER BY s.created_at, s.run_id)
+            )
+            SELECT query, expected, occurrence, COUNT(*) AS flips,
+                   MAX(created_at) AS last_flip,
+                   SUM(predicted = expected) - SUM(previous = expected) AS net_fixed
+            FROM ordered
+            WHERE previous IS NOT NULL AND predicted IS NOT previous
+            GROUP BY query, expected, category, occurrence
+            ORDER BY flips DESC, last_flip DESC
+            LIMIT ?""", args).fetchall()
+
+        scope = f"last {last} {'prompt revisions' if by_prompt else 'runs'}" if last else "all runs"
+        print(f"\n🔀 FLIPS ({scope}): {len(rows)} cases")
+        print("=" * 96)
+        for query, expected, occurrence, flips, last_flip, net_fixed in rows:
+            trend = "fixed" if net_fixed > 0 else ("broke" if net_fixed < 0 else "unstable")
+            repeat = f" #{occurrence}" if occurrence > 1 else ""
+            print(f"   {flips:3d}x  {trend:8s}  last {last_flip}  \"{query}\"{repeat} (expected {expected})")
+
+    def trends(self, category: Optional[str] = None, by_prompt: bool = False, last: Optional[int] = None,
+               model: Optional[str] = None) -> None:
+        """Accuracy per run (or per prompt revision) over time"""
+        selected, args = select_runs_sql(last, by_prompt, model)
+        category_filter = ""
+        if category:
+            category_filter = "WHERE r.category LIKE ?"
+            args.append(f"%{category}%")
+        rows = self.conn.execute(f"""
+            WITH selected AS ({selected})
+            SELECT s.run_id, s.created_at, s.prompt_hash, COUNT(*) AS cases,
+                   AVG(r.correct) AS accuracy, AVG(r.confidence) AS confidence
+            FROM results r JOIN selected s USING (run_id)
+            {category_filter}
+            GROUP BY s.run_id
+            ORDER BY s.created_at""", args).fetchall()
+
+        print(f"\n📈 ACCURACY TREND{f' ({category})' if category else ''}: {len(rows)} runs")
+        print("=" * 96)
+        previous = None
+        for run_id, created_at, prompt_hash, cases, accuracy, confidence in rows:
+            delta = f"{accuracy - previous:+.1%}" if previous is not None else ""
+            bar = "█" * int(accuracy * 30)
+            print(f"   {created_at:19s}  {run_id[:8]}  {prompt_hash or '-':16s}  {cases:7d}  "
+                  f"{accuracy:6.1%} {delta:>7s}  conf {confidence:.2f}  {bar}")
+            previous = accuracy
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite warehouse for exported evaluation runs')
+    parser.add_argument('--db', default=DEFAULT_DB, help='Warehouse database file')
+    commands = parser.add_subparsers(dest='command')
+
+    ingest = commands.add_parser('ingest', help='Ingest exported runs (.json or .csv)')
+    ingest.add_argument('files', nargs='+')
+
+    runs = commands.add_parser('runs', help='List recent runs')
+    runs.add_argument('--limit', type=int, default=20)
+
+    history = commands.add_parser('history', help='Predictions for one query across runs')
+    history.add_argument('query')
+    history.add_argument('--limit', type=int, default=50)
+
+    for name, help_text in (('flips', 'Queries whose prediction changed between runs'),
+                            ('trends', 'Accuracy over runs')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--last', type=int, default=20 if name == 'flips' else None, help='Only the most recent N runs')
+        command.add_argument('--by-prompt', action='store_true', help='Compare the latest run of each prompt revision')
+        command.add_argument('--model', help='Only runs of this model')
+        command.add_argument('--category', help='Only cases in matching categories')
+        if name == 'flips':
+            command.add_argument('--limit', type=int, default=50)
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    warehouse = ResultsWarehouse(args.db)
+    if args.command == 'ingest':
+        warehouse.ingest(args.files)
+    elif args.command == 'runs':
+        warehouse.runs(args.limit)
+    elif args.command == 'history':
+        warehouse.history(args.query, args.limit)
+    elif args.command == 'flips':
+        warehouse.flips(args.last, args.by_prompt, args.model, args.category, args.limit)
+    elif args.command == 'trends':
+        warehouse.trends(args.category, args.by_prompt, args.last, args.model)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Stand-in OpenAI-compatible Server
+
+Answers /v1/chat/completions like `mlc_llm serve` does, without a model: it
+classifies intent prompts with a keyword heuristic and returns verdicts in the
+prompt's JSON format, so the HTTP backend can be exercised anywhere. Supports
+streaming (server-sent events), include_usage, keep-alive and concurrent
+requests. Answers are fast and deterministic, not accurate.
+
+Usage:
+    python mlc_llm/stub_openai_server.py --port 8000
+    python mlc_llm/stub_openai_server.py --port 8000 --latency 0.05 --token-delay 0.002
+    python mlc_llm/eval_intent_detection.py --full-eval --server-url http://127.0.0.1:8000
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+SEARCH_WORDS = re.compile(r"\b(find|search|show|look\s*up|get|list|fetch|browse|posts?|threads?|discussions?)\b", re.IGNORECASE)
+SINGLE_RE = re.compile(r'User message: "(.*)"')
+MULTI_RE = re.compile(r'^(\d+)\. (".*")$', re.MULTILINE)
+
+def verdict(message: str) -> Dict:
+    match = SEARCH_WORDS.search(message)
+    return {
+        "isSearch": bool(match),
+        "searchQuery": message if match else None,
+        "confidence": 0.8 if match else 0.7,
+        "reasoning": f"matched '{match.group()}'" if match else "no search keywords",
+    }
+
+def answer(messages: List[Dict]) -> str:
+    """Reply to the last user message in the intent prompt's JSON format"""
+    prompt = messages[-1].get("content", "") if messages else ""
+    if "User messages:" in prompt:
+        listing = [(int(number), json.loads(query)) for number, query in MULTI_RE.findall(prompt)]
+        return json.dumps([dict(verdict(query), id=number) for number, query in listing])
+    match = SINGLE_RE.search(prompt)
+    return json.dumps(verdict(match.group(1) if match else prompt))
+
+def count_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive and chunked streaming
+    model = "stub"
+    latency = 0.0
+    token_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: Dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self.send_json(200, {"object": "list", "data": [{"id": self.model, "object": "model"}]})
+        else:
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self.send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            messages = request["messages"]
+        except (ValueError, KeyError) as e:
+            self.send_json(400, {"error": {"message": f"Bad request: {e}"}})
+            return
+
+        content = answer(messages)
+        prompt_tokens = sum(count_tokens(m.get("content", "")) for m in messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": count_tokens(content),
+            "total_tokens": prompt_tokens + count_tokens(content),
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        time.sleep(self.latency)
+
+        if not request.get("stream"):
+            self.send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": self.model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(choices: List[Dict], **extra) -> bytes:
+            chunk = dict({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                          "model": self.model, "choices": choices}, **extra)
+            return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+        try:
+            pieces = re.findall(r".{1,8}", content, re.DOTALL)
+            for i, piece in enumerate(pieces):
+                time.sleep(self.token_delay)
+                finish = "stop" if i == len(pieces) - 1 else None
+                self.send_chunk(event([{"index": 0, "delta": {"content": piece}, "finish_reason": finish}]))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                self.send_chunk(event([], usage=usage))
+            self.send_chunk(b"data: [DONE]\n\n")
+            self.send_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the request
+            self.close_connection = True
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in OpenAI-compatible server for testing the HTTP backend')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('--model', default='stub', help='Model id reported by /v1/models')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before each response starts (simulated prefill)')
+    parser.add_argument('--token-delay', type=float, default=0.0, help='Seconds between streamed chunks (simulated decode)')
+
+    args = parser.parse_args()
+
+    StubHandler.model = args.model
+    StubHandler.latency = args.latency
+    StubHandler.token_delay = args.token_delay
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"🧪 Stub OpenAI server on http://{args.host}:{server.server_port} (model: {args.model})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Interrupted by user")
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
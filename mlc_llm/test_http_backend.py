@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Checks for the HTTP backend against the stand-in server
+
+Starts stub_openai_server.py in-process on a free port and drives HTTPEngine
+through it: keep-alive reuse, streaming with usage, and cancelling a stream.
+Needs only the standard library (no model, no mlc_llm).
+
+Usage:
+    python -m unittest discover -s mlc_llm -p "test_*.py"
+    python mlc_llm/test_http_backend.py
+"""
+
+import importlib.util
+import json
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+from http_backend import HTTPEngine
+from stub_openai_server import StubHandler
+
+PROMPT = 'Classify the message.\n\nUser message: "find AI discussions"'
+
+class SlowStubHandler(StubHandler):
+    token_delay = 0.01  # several chunks in flight, so a stream can be cancelled part-way
+
+class HTTPBackendTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStubHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.engine = HTTPEngine(self.url, timeout=10)
+
+    def tearDown(self):
+        self.engine.terminate()
+
+    def create(self, **kwargs):
+        return self.engine.chat.completions.create(messages=[{"role": "user", "content": PROMPT}], **kwargs)
+
+    def test_sequential_requests_reuse_one_connection(self):
+        first = self.create(stream=False)
+        self.assertTrue(json.loads(first.choices[0].message.content)["isSearch"])
+        self.assertEqual(self.engine.pool.idle.qsize(), 1)
+        conn = self.engine.pool.idle.queue[-1]
+
+        self.create(stream=False)
+        self.assertEqual(self.engine.pool.idle.qsize(), 1)
+        self.assertIs(self.engine.pool.idle.queue[-1], conn)
+        self.assertIsNotNone(conn.sock)
+
+    def test_stream_with_usage(self):
+        chunks = list(self.create(stream=True, stream_options={"include_usage": True}))
+        content = "".join(c.choices[0].delta.content or "" for c in chunks if c.choices)
+        self.assertTrue(json.loads(content)["isSearch"])
+        usage = chunks[-1].usage
+        self.assertIsNotNone(usage)
+        self.assertGreater(usage.prompt_tokens, 0)
+        self.assertGreater(usage.completion_tokens, 0)
+        # A fully read stream goes back to the pool
+        self.assertEqual(self.engine.pool.idle.qsize(), 1)
+
+    def test_cancelled_stream_closes_its_connection(self):
+        self.engine.model_id()  # leaves exactly one idle connection, which the stream picks up
+        self.assertEqual(self.engine.pool.idle.qsize(), 1)
+        conn = self.engine.pool.idle.queue[-1]
+        stream = self.create(stream=True)
+        next(stream)
+        self.assertEqual(self.engine.pool.idle.qsize(), 0)
+        stream.close()
+
+        # The connection the stream used is closed, not returned for reuse
+        self.assertEqual(self.engine.pool.idle.qsize(), 0)
+        self.assertIsNone(conn.sock)
+
+        # The engine still works afterwards, on a fresh connection
+        self.assertTrue(json.loads(self.create(stream=False).choices[0].message.content)["isSearch"])
+
+    def test_quick_test_keeps_server_client_across_calls(self):
+        path = Path(__file__).with_name("quick-intent-test.py")
+        spec = importlib.util.spec_from_file_location("quick_intent_test", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.MLC_AVAILABLE = False  # the server path must not need mlc_llm
+
+        tester = module.IntentTester(server_url=self.url, request_timeout=10)
+        self.assertTrue(tester.init_engine())
+        engine = tester.engine
+        self.assertTrue(tester.init_engine())
+        self.assertIs(tester.engine, engine)
+        engine.terminate()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Request Timeline Tracing
+
+Records spans in the Chrome trace-event format, which opens as a timeline in
+Perfetto (https://ui.perfetto.dev) or chrome://tracing. Timestamps come from
+time.perf_counter() so spans recorded by different threads line up.
+
+Code on the hot path should hold a tracer and call it unconditionally; the
+default NULL_TRACER makes every call a no-op:
+
+    with self.tracer.span("parse", category=tc.category):
+        parsed = self.parse_response(response)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+class Tracer:
+    enabled = True
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events: List[Dict] = []
+        self.thread_ids: Dict[int, int] = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def _tid(self) -> int:
+        """Small stable id per thread, so each worker gets its own timeline row"""
+        ident = threading.get_ident()
+        tid = self.thread_ids.get(ident)
+        if tid is None:
+            with self.lock:
+                tid = self.thread_ids.setdefault(ident, len(self.thread_ids) + 1)
+        return tid
+
+    def complete(self, name: str, start: float, end: float, **args) -> None:
+        """Record a span from perf_counter() timestamps"""
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - self.origin) * 1e6,
+            "dur": max(0.0, end - start) * 1e6,
+            "pid": self.pid,
+            "tid": self._tid(),
+        }
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.events.append(event)
+
+    def async_span(self, name: str, start: float, end: float, span_id: int, **args) -> None:
+        """Record a span that may overlap others, drawn on its own async track"""
+        common = {"name": name, "cat": name, "id": span_id, "pid": self.pid, "tid": self._tid()}
+        begin = dict(common, ph="b", ts=(start - self.origin) * 1e6)
+        if args:
+            begin["args"] = args
+        finish = dict(common, ph="e", ts=(end - self.origin) * 1e6)
+        with self.lock:
+            self.events.extend([begin, finish])
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """Record the enclosed block as a span"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, start, time.perf_counter(), **args)
+
+    def save(self, filename: str) -> None:
+        """Write the trace as Chrome trace-event JSON"""
+        names = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": f"worker-{tid}"}}
+            for tid in self.thread_ids.values()
+        ]
+        with self.lock:
+            trace = {"traceEvents": names + self.events, "displayTimeUnit": "ms"}
+        with open(Path(filename), 'w') as f:
+            json.dump(trace, f)
+        print(f"📄 Trace with {len(self.events)} spans written to {filename}")
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class NullTracer:
+    """Tracer stand-in used when tracing is off"""
+    enabled = False
+    _span = _NullSpan()
+
+    def complete(self, name: str, start: float, end: float, **args) -> None:
+        pass
+
+    def async_span(self, name: str, start: float, end: float, span_id: int, **args) -> None:
+        pass
+
+    def span(self, name: str, **args):
+        return self._span
+
+    def save(self, filename: str) -> None:
+        pass
+
+NULL_TRACER = NullTracer()
+
+def make_tracer(filename: Optional[str]):
+    """A recording Tracer when a trace file is requested, else NULL_TRACER"""
+    return Tracer() if filename else NULL_TRACER
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Bulk Weak Labeling for Intent Detection
+
+Labels queries as action (search) or chat with hand-written rules, fast enough
+to prefilter or pre-label millions of logged queries on one core. All rules
+are compiled into a single regex, so a query no rule matches is rejected with
+one scan. After a match, only the rules that could still change the label
+(stronger ones) are scanned for, again as one combined regex each. Word
+boundaries keep "find" from matching "findings".
+
+Rules have priorities. Search verbs and content nouns vote action. Meta
+questions about searching ("how do I search effectively?"), advice requests
+("should I look for React tutorials?") and negations ("don't search, just
+explain") outrank them and vote chat. Opinion and explanation requests sit in
+between. Queries no rule matches default to chat.
+
+Output is JSONL in the --cases format. The deciding rule becomes the category.
+Difficulty is easy when all matched rules agree, hard when a weaker rule voted
+the other way and medium when none matched. --provenance also lists every
+matched rule under `rules`; that tests each rule on its own, so it is slower. Load the output with `eval_intent_detection.py --cases` to
+spot-check it against the model.
+
+The rules were written while looking at the built-in test cases, so agreement
+with those is a development-set number. Pass a labeled file with --evaluate
+(e.g. hand-labeled logs) for an estimate that means something; for generated
+corpora, rows that are verbatim built-in queries are skipped.
+
+Usage:
+    python mlc_llm/weak_label.py queries.txt --output labeled.jsonl
+    python mlc_llm/weak_label.py logs.jsonl --field text --only action --output search-queries.jsonl
+    python mlc_llm/weak_label.py queries.txt --provenance | head
+    cat queries.txt | python mlc_llm/weak_label.py - | head
+    zcat logs.jsonl.gz | python mlc_llm/weak_label.py - --format jsonl --field text
+    python mlc_llm/weak_label.py --evaluate
+    python mlc_llm/weak_label.py labeled-logs.jsonl --evaluate
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+def typos(word: str) -> List[str]:
+    """Single deletions, adjacent swaps and doubled letters of a word"""
+    variants = set()
+    for i in range(len(word)):
+        variants.add(word[:i] + word[i + 1:])
+        variants.add(word[:i] + word[i] + word[i:])
+        if i + 1 < len(word):
+            variants.add(word[:i] + word[i + 1] + word[i] + word[i + 2:])
+    variants.discard(word)
+    return sorted(variants)
+
+# Only verbs long enough that a one-letter slip can't land on another common word
+SEARCH_TYPOS = "|".join(typos("search") + typos("browse"))
+
+# (name, label, priority, pattern). Patterns may only use non-capturing groups,
+# and every alternative must start with \b before a letter or with ^.
+RULES = [
+    # Talking about searching is not a search
+    ("meta_search", "chat", 3,
+     r"\bhow (?:do|can|should|would|could) (?:i|we|you|one) (?:search|find|look)\w*"
+     r"|\bwhat\b[^.?!]{0,30}\b(?:i|we) should (?:search|look|find)\w*"),
+    ("advice", "chat", 3,
+     r"\b(?:should|would|could) (?:i|we) (?:search|look|find)\w*"
+     r"|\bis it (?:worth|a good idea) (?:search|look|find)\w*"),
+    # "without" only negates searching itself: "find posts without showing spoilers" is a search
+    ("negation", "chat", 3,
+     r"\b(?:don'?t|do not|never|no need to|stop) (?:\w+ ){0,2}?(?:search|find|look|show)\w*"
+     r"|\bwithout (?:searching|looking (?:\w+ )?up|googling)\b"),
+
+    ("opinion", "chat", 2,
+     r"\b(?:what(?:'s| is) your (?:opinion|take|view)|(?:your|any) (?:thoughts|take|opinions?|views?|insights?)"
+     r"|what do you think|what would you say|thoughts on)\b"),
+    # Bare "what is"/"how does" only open a question; after "show me" or "find" they
+    # are part of the search ("show me what is new in React")
+    ("explanation", "chat", 2,
+     r"\b(?:(?:can|could) you explain|explain|walk me through|help me understand|tell me about"
+     r"|i want to know|i(?:'d| would) (?:like|love) to (?:learn|know|understand))\b"
+     r"|^\s*(?:what (?:is|are)(?! (?:new|happening|going on|people|folks|everyone)\b)|how does|how do(?! i\b))\b"),
+
+    ("search_verb", "action", 1,
+     r"\b(?:find|search|look(?:ing)? (?:up|for|into)|show me|get me|retrieve|fetch"
+     r"|pull up|bring up|surface|browse|" + SEARCH_TYPOS + r")\b"),
+    ("content_noun", "action", 1,
+     r"\b(?:posts?|threads?|discussions?)\b"),
+    ("any_on", "action", 1,
+     r"^\s*any(?:thing)? (?:\w+ ){0,2}?(?:on|about|new)\b"),
+    ("whats_new", "action", 1,
+     r"\bwhat(?:'s| is| are| has| have)? (?:been )?(?:new|going on|said|happening)\b|^\s*what about\b"
+     r"|\bwhat (?:are|is) (?:people|folks|everyone) (?:saying|talking|posting|sharing)\b"),
+    ("continuation", "action", 1,
+     r"^\s*(?:more on|what else|continue|next|similar)\b"),
+
+    ("small_talk", "chat", 0,
+     r"^\s*(?:hi|hello|hey|yo|good (?:morning|afternoon|evening)|thanks?|thank you|ok(?:ay)?|cool)\b"
+     r"|\bthat'?s interesting\b|\bi don'?t understand\b|\bhow are you\b"),
+]
+
+DEFAULT_LABEL = "chat"
+
+def combine(rules: List[Tuple[str, str, int, str]]) -> Optional["re.Pattern"]:
+    """One regex for several rules; a match's lastgroup names the rule"""
+    if not rules:
+        return None
+    # Every rule starts at a word start or the start of the query, so the
+    # shared guard rejects positions inside words before any rule is tried
+    alternatives = "|".join(f"(?P<{name}>{pattern})" for name, _, _, pattern in rules)
+    return re.compile(rf"(?<!\w)(?:{alternatives})", re.IGNORECASE)
+
+class WeakLabeler:
+    def __init__(self, rules: List[Tuple[str, str, int, str]] = RULES):
+        for name, _, _, pattern in rules:
+            if not name.isidentifier():
+                raise ValueError(f"Rule name {name!r} must be a valid identifier")
+            if re.compile(pattern).groups:
+                raise ValueError(f"Rule {name} uses a capturing group; use (?:...) instead")
+        # Strongest first, so a match names the strongest rule at its position
+        ordered = sorted(rules, key=lambda rule: -rule[2])
+        self.rules = {name: (label, priority) for name, label, priority, _ in rules}
+        self.pattern = combine(ordered)
+        self.patterns = [(name, re.compile(pattern, re.IGNORECASE)) for name, _, _, pattern in ordered]
+        # After a match, one combined scan for rules voting the other way
+        # settles most queries; stronger rules are only scanned for when they exist
+        self.rivals = {label: combine([rule for rule in ordered if rule[1] != label]) for _, label, _, _ in rules}
+        self.above = {priority: combine([rule for rule in ordered if rule[2] > priority])
+                      for _, _, priority, _ in rules}
+        self.stronger = {(label, priority): combine([rule for rule in ordered if rule[1] == label and rule[2] > priority])
+                         for _, label, priority, _ in rules}
+
+    def decide(self, query: str) -> Tuple[str, Optional[str], bool]:
+        """Label, deciding rule (None when no rule matched) and whether a rule voted the other way"""
+        match = self.pattern.search(query)
+        if not match:
+            return DEFAULT_LABEL, None, False
+        rule = match.lastgroup
+        conflict = False
+        # Each step moves to a strictly stronger rule, so this ends
+        while True:
+            label, priority = self.rules[rule]
+            rivals = self.rivals[label]
+            match = rivals.search(query) if rivals else None
+            if match:
+                conflict = True
+                if self.rules[match.lastgroup][1] > priority:
+                    rule = match.lastgroup
+                    continue
+                # The leftmost rival is weaker, but a stronger rule may match further on
+                stronger = self.above[priority]
+            else:
+                # The label is settled; a stronger rule may still be the one deciding it
+                stronger = self.stronger[(label, priority)]
+            match = stronger.search(query) if stronger else None
+            if not match:
+                return label, rule, conflict
+            rule = match.lastgroup
+
+    def label(self, query: str) -> Tuple[str, Optional[str]]:
+        """Label and the deciding rule (None when no rule matched)"""
+        label, rule, _ = self.decide(query)
+        return label, rule
+
+    def matches(self, query: str) -> List[str]:
+        """Names of every matched rule, strongest first"""
+        # Each rule is tested on its own: one scan of the combined pattern
+        # would skip rules whose match overlaps an earlier one
+        return [name for name, pattern in self.patterns if pattern.search(query)]
+
+    def row(self, query: str, provenance: bool = False) -> Dict:
+        """A --cases row for the query; provenance lists every matched rule"""
+        label, rule, conflict = self.decide(query)
+        if rule is None:
+            difficulty = "medium"
+        else:
+            difficulty = "hard" if conflict else "easy"
+        row = {
+            "query": query,
+            "expected": label,
+            "category": rule or "no_rule",
+            "difficulty": difficulty,
+            "notes": "weak label",
+        }
+        if provenance:
+            row["rules"] = self.matches(query)
+        return row
+
+def read_queries(path: str, field: str = "query", fmt: Optional[str] = None) -> Iterator[str]:
+    """Stream queries from a text file (one per line) or JSONL (the given field); '-' reads stdin
+
+    The format follows the file suffix (.jsonl, anything else is text) unless
+    fmt is given. Undecodable JSONL lines are skipped and counted.
+    """
+    if fmt is None:
+        fmt = "jsonl" if Path(path).suffix.lower() == ".jsonl" else "text"
+    f = sys.stdin if path == "-" else open(path, buffering=1 << 20)
+    skipped = 0
+    try:
+        for line in f:
+            if fmt == "jsonl":
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    skipped += 1
+                    continue
+                value = record.get(field) if isinstance(record, dict) else None
+                if isinstance(value, str):
+                    yield value
+            elif line.strip():
+                yield line.rstrip("\n")
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    if skipped:
+        print(f"⚠️  Skipped {skipped:,} undecodable JSONL lines in {path}", file=sys.stderr)
+
+def evaluate(labeler: WeakLabeler, path: Optional[str] = None) -> None:
+    """Agreement with hand labels: the built-in test cases, or a labeled file"""
+    from eval_intent_detection import COMPREHENSIVE_TEST_CASES, load_test_cases
+
+    if path:
+        # Verbatim built-in queries (e.g. seed rows of a generated corpus) are what the rules were written on
+        seen = {tc.query for tc in COMPREHENSIVE_TEST_CASES}
+        cases = [tc for tc in load_test_cases(path) if tc.expected in ("action", "chat") and tc.query not in seen]
+        scope = f"{len(cases):,} held-out cases from {path}"
+    else:
+        cases = COMPREHENSIVE_TEST_CASES
+        scope = f"the {len(cases)} built-in test cases (development set: the rules were written against them)"
+
+    misses = []
+    for tc in cases:
+        label, _ = labeler.label(tc.query)
+        if label != tc.expected:
+            misses.append((tc, label))
+    total = len(cases)
+    agreed = total - len(misses)
+    print(f"🏷️  Weak labels agree with {agreed:,}/{total:,} of {scope} ({agreed / total if total else 0:.1%})")
+    by_category = Counter(tc.category for tc, _ in misses)
+    if path and by_category:
+        print("   Misses by category: " + ", ".join(f"{category} {count:,}" for category, count in by_category.most_common(8)))
+    for tc, label in misses[:20]:
+        matched = labeler.matches(tc.query)
+        print(f"   \"{tc.query}\" → {label} via {', '.join(matched) or 'default'} (expected {tc.expected}, {tc.category})")
+    if len(misses) > 20:
+        print(f"   ... and {len(misses) - 20:,} more")
+
+def main():
+    parser = argparse.ArgumentParser(description='Rule-based bulk weak labeling of queries (JSONL in the --cases format)')
+    parser.add_argument('input', nargs='?', help="Text file (one query per line) or JSONL file; '-' for stdin")
+    parser.add_argument('--output', help='Output JSONL file (default: stdout)')
+    parser.add_argument('--field', default='query', help='Query field for JSONL input')
+    parser.add_argument('--format', choices=['text', 'jsonl'],
+                        help='Input format (default: jsonl for .jsonl files, text otherwise, including stdin)')
+    parser.add_argument('--only', choices=['action', 'chat'], help='Keep only queries with this label (prefiltering)')
+    parser.add_argument('--provenance', action='store_true',
+                        help='List every matched rule under "rules" (tests each rule separately; slower)')
+    parser.add_argument('--evaluate', action='store_true',
+                        help='Check the rules against the labeled input file (default: the built-in test cases)')
+
+    args = parser.parse_args()
+
+    labeler = WeakLabeler()
+    if args.evaluate:
+        evaluate(labeler, args.input)
+        return 0
+    if not args.input:
+        parser.print_help()
+        return 1
+
+    out = open(args.output, 'w', buffering=1 << 20) if args.output else sys.stdout
+    counts = Counter()
+    labels = Counter()
+    start = time.perf_counter()
+    try:
+        for query in read_queries(args.input, args.field, args.format):
+            row = labeler.row(query, args.provenance)
+            counts["read"] += 1
+            labels[row["expected"]] += 1
+            counts[row["category"]] += 1
+            if args.only and row["expected"] != args.only:
+                continue
+            out.write(json.dumps(row) + "\n")
+    except KeyboardInterrupt:
+        print("\n👋 Interrupted by user", file=sys.stderr)
+    except BrokenPipeError:
+        # Output piped into head or similar
+        return 0
+    finally:
+        if args.output:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    read = counts.pop("read", 0)
+    # Summary goes to stderr so stdout stays pure JSONL
+    print(f"🏷️  Labeled {read:,} queries in {elapsed:.1f}s ({read / elapsed * 60 if elapsed else 0:,.0f}/min): "
+          f"{labels['action']:,} action, {labels['chat']:,} chat", file=sys.stderr)
+    for rule, count in counts.most_common():
+        print(f"   {rule:14s} {count:,}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())